@@ -4,43 +4,86 @@ from mongoengine import disconnect
 from .models import db, User
 from config import Config
 from .api import api as api_blueprint
-from .auth import auth as auth_blueprint
+from .auth import auth as auth_blueprint, load_token_user, HeaderAuthSessionInterface
 from flask_cors import CORS
 from .cli import init_cli
+from .encoders import init_json
+from .compress import init_compression
+from .cache import prompt_list_cache, user_cache
+from .stats import prompt_stats
+from .counters import counter_buffer
+from .cleanup import cascade_deleter
+from .hashing import password_hasher
+from .search import search_index, suggest_index
+from .tokens import token_revocations
+from .log import init_logging
+import logging
 import time
 
+logger = logging.getLogger(__name__)
+
 login_manager = LoginManager()
 
 
 @login_manager.user_loader
 def load_user(user_id):
     try:
-        return User.objects(id=user_id).first()
+        return User.get_snapshot(user_id)
     except:
         return None
 
 
+@login_manager.request_loader
+def load_user_from_request(request):
+    # session 中没有用户时（无状态模式）从 Authorization 头认证
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        return None
+    try:
+        user = load_token_user(auth_header.split(" ")[1])
+    except Exception:
+        return None
+    if user is not None:
+        # 由 HeaderAuthSessionInterface 跳过本次请求的 session cookie
+        g.login_via_header = True
+    return user
+
+
 def create_app(config_class=Config):
-    print("Initializing Flask application...")
     app = Flask(__name__)
     app.config.from_object(config_class)
+    init_logging(app)
+    logger.info("Initializing Flask application...")
+    # 需在 db.init_app 之前设置，flask_mongoengine 会在此基础上包装编码器
+    init_json(app)
 
-    print("Initializing database...")
+    logger.info("Initializing database...")
     try:
         disconnect()
         db.init_app(app)
-        print("Database initialized successfully")
-    except Exception as e:
-        print(f"Error initializing database: {str(e)}")
+        logger.info("Database initialized successfully")
+    except Exception:
+        logger.exception("Error initializing database")
         raise
 
-    print("Initializing login manager...")
+    logger.info("Initializing login manager...")
     login_manager.init_app(app)
     login_manager.login_view = "auth.login"
     login_manager.login_message = "Please log in to access this page."
     login_manager.login_message_category = "info"
+    app.session_interface = HeaderAuthSessionInterface()
 
-    print("Registering blueprints...")
+    prompt_list_cache.init_app(app, "PROMPT_LIST_CACHE")
+    user_cache.init_app(app, "USER_CACHE")
+    token_revocations.init_app(app)
+    password_hasher.init_app(app)
+    cascade_deleter.init_app(app)
+    prompt_stats.init_app(app)
+    counter_buffer.init_app(app)
+    search_index.init_app(app)
+    suggest_index.init_app(app)
+
+    logger.info("Registering blueprints...")
     app.register_blueprint(api_blueprint, url_prefix="/api/v1")
     app.register_blueprint(auth_blueprint, url_prefix="/api/v1/auth")
     allowed_origins = ["http://localhost:5173", "https://cursor.beauty", "https://www.cursor.beauty"]
@@ -87,8 +130,11 @@ def create_app(config_class=Config):
         
         return response
 
+    if app.config.get("COMPRESS_ENABLED"):
+        init_compression(app)
+
     # 初始化命令行工具
     init_cli(app)
 
-    print("Flask application initialized successfully")
+    logger.info("Flask application initialized successfully")
     return app
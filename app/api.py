@@ -1,5 +1,5 @@
 from flask import Blueprint, jsonify, request, current_app
-from flask_login import current_user, login_required, login_user
+from flask_login import current_user, login_required
 from .models import (
     Prompt,
     Language,
@@ -7,43 +7,223 @@ from .models import (
     Favorite,
     User,
     PromptStatus,
+    PromptType,
     UserRole,
     Review,
     ReviewStatus,
+    DeleteJob,
+    get_utc_now,
 )
-from .auth import jwt_required, admin_required
+from .auth import (
+    jwt_required,
+    admin_required,
+    authenticate,
+    hasher_busy_response,
+    load_token_user,
+)
+from .cache import prompt_list_cache, user_cache
+from .cleanup import CASCADE_MODELS, cascade_deleter
+from .counters import counter_buffer
+from .hashing import HasherBusy
+from .search import search_index, suggest_index
+from .stats import prompt_stats
+from .tokens import token_revocations
+from .utils import InvalidCursor, clamp_per_page, decode_cursor, encode_cursor
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import os
 import uuid
+from mongoengine.errors import NotUniqueError
 from mongoengine.queryset.visitor import Q
+import logging
 
 api = Blueprint("api", __name__)
+logger = logging.getLogger(__name__)
+
+# 列表排序方式对应的排序字段（均为降序），最后的 id 用于打破并列
+PROMPT_SORT_FIELDS = {
+    "latest": ["created_at", "id"],
+    "popular": ["likes_count", "created_at", "id"],
+}
+
+
+# 摘要的默认字符数
+EXCERPT_LENGTH = 200
+# excerpt= 参数允许的最大字符数
+MAX_EXCERPT_LENGTH = 2000
+
+# 列表接口可选的输出字段及其依赖的文档字段，用于 fields= 参数和投影下推
+PROMPT_OUTPUT_FIELDS = {
+    "id": (),
+    "title": ("title",),
+    "content": ("content",),
+    "excerpt": ("content",),
+    "status": ("status",),
+    "author": ("author",),
+    "language": ("language",),
+    "likes_count": ("likes_count",),
+    "favorites_count": ("favorites_count",),
+    "created_at": ("created_at",),
+    "is_liked": (),
+    "is_favorited": (),
+}
+
+
+def seek_query(fields, values):
+    """构建降序键集分页的查询条件：(fields) < (values)"""
+    query = None
+    for i, field in enumerate(fields):
+        clause = dict(zip(fields[:i], values[:i]))
+        clause[f"{field}__lt"] = values[i]
+        query = Q(**clause) if query is None else query | Q(**clause)
+    return query
+
+
+def cursor_for(prompt, sort):
+    """根据当前页最后一个提示词生成下一页游标"""
+    fields = PROMPT_SORT_FIELDS[sort]
+    return encode_cursor(sort, [prompt_value(prompt, f) for f in fields])
+
+
+def invalidate_prompt_lists(*languages, sort=None):
+    """失效受写操作影响的匿名列表缓存
+
+    languages 为受影响的语言 slug，未按语言筛选的列表总会被失效；
+    不传 languages 时失效所有语言。sort 限定只失效某种排序。
+    """
+    slugs = {None, *languages}
+
+    def affected(key):
+        key_sort, key_language = key[0], key[1]
+        if sort is not None and key_sort != sort:
+            return False
+        return not languages or key_language in slugs
+
+    prompt_list_cache.invalidate(affected)
+
+
+def language_slugs(*prompts):
+    """取出提示词所属语言的 slug"""
+    return [p.language.slug for p in prompts if p is not None and p.language]
+
+
+def after_prompt_saved(prompt, *old_languages):
+    """提示词新建、修改或状态变化后，刷新列表缓存、统计快照和内存索引
+
+    old_languages 为修改前所属语言的 slug。
+    """
+    invalidate_prompt_lists(*old_languages, *language_slugs(prompt))
+    prompt_stats.invalidate()
+    search_index.update(prompt)
+    suggest_index.update(prompt)
+
+
+def after_prompts_updated(prompts):
+    """批量修改提示词后，一次性刷新列表缓存和统计快照，再逐条更新内存索引"""
+    invalidate_prompt_lists(*language_slugs(*prompts))
+    prompt_stats.invalidate()
+    for prompt in prompts:
+        search_index.update(prompt)
+        suggest_index.update(prompt)
+
+
+def after_prompt_deleted(prompt):
+    """提示词删除后，刷新列表缓存、统计快照和内存索引"""
+    after_prompts_deleted([prompt])
+
 
+def after_prompts_deleted(prompts):
+    """一批提示词删除后，一次性刷新列表缓存和统计快照，再逐条移出内存索引"""
+    invalidate_prompt_lists(*language_slugs(*prompts))
+    prompt_stats.invalidate()
+    for prompt in prompts:
+        search_index.remove(prompt.id)
+        suggest_index.remove(prompt.id)
 
-def serialize_prompt(prompt, user_liked_prompts=None, user_favorited_prompts=None):
-    """序列化 Prompt 对象为 JSON 格式"""
+
+def delete_prompts(prompt_ids):
+    """删除提示词，关联的点赞、收藏和审核记录交给后台任务清理
+
+    返回 (清理任务, 实际删除的提示词)，提示词都不存在时任务为 None。
+    """
+    prompts = list(Prompt.objects(id__in=prompt_ids).only("language").select_related())
+    if not prompts:
+        return None, []
+    job = cascade_deleter.submit([p.id for p in prompts], current_user.id)
+    after_prompts_deleted(prompts)
+    return job, prompts
+
+
+def serialize_delete_job(job):
+    """序列化清理任务及其进度"""
+    return {
+        "id": str(job.id),
+        "status": job.status,
+        "prompts_count": len(job.prompt_ids),
+        "deleted": {name: job.deleted.get(name, 0) for name, _ in CASCADE_MODELS},
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def cache_headers(response, etag, private=False):
+    """设置弱 ETag 和 Cache-Control
+
+    公开响应允许代理在 stale-while-revalidate 秒内先返回旧内容再后台验证；
+    与用户相关的响应只允许浏览器缓存，每次使用前都要重新验证。
+    """
+    response.set_etag(etag, weak=True)
+    if private:
+        response.headers["Cache-Control"] = "private, no-cache"
+    else:
+        response.headers["Cache-Control"] = "public, max-age={}, stale-while-revalidate={}".format(
+            current_app.config["HTTP_CACHE_MAX_AGE"],
+            current_app.config["HTTP_CACHE_STALE_WHILE_REVALIDATE"],
+        )
+    response.vary.add("Authorization")
+    return response
+
+
+def not_modified(etag, private=False):
+    """If-None-Match 与 etag 匹配时返回 304 响应，否则返回 None"""
+    if request.if_none_match.contains_weak(etag):
+        return cache_headers(current_app.response_class(status=304), etag, private)
+    return None
+
+
+def serialize_prompt(
+    prompt,
+    user_liked_prompts=None,
+    user_favorited_prompts=None,
+    authors=None,
+    languages=None,
+):
+    """序列化 Prompt 对象为 JSON 格式
+
+    authors / languages 为预先批量取回的 {id: 文档} 映射，传入时不再逐个解引用。
+    """
     try:
         # 如果传入了预加载的数据，使用预加载的数据
         is_liked = False
         is_favorited = False
 
-        # 调试信息
-        print(f"正在序列化提示: {prompt}")
-        print(f"提示类型: {type(prompt)}")
-
         if isinstance(prompt, dict):
             # 确保_id存在
             if "_id" not in prompt:
-                print("错误：提示对象中没有_id字段")
+                logger.warning("Prompt document without _id, skipped")
                 return None
 
             author = prompt.get("author", {})
             language = prompt.get("language", {})
 
-            # 调试信息
-            print(f"作者信息: {author}")
-            print(f"语言信息: {language}")
+            # 调试信息（按 logger 限流采样）
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Serializing prompt %s author=%s language=%s",
+                    prompt["_id"],
+                    author,
+                    language,
+                )
 
             if user_liked_prompts is not None:
                 is_liked = str(prompt["_id"]) in user_liked_prompts
@@ -81,20 +261,26 @@ def serialize_prompt(prompt, user_liked_prompts=None, user_favorited_prompts=Non
                 ),
                 "likes_count": prompt.get("likes_count", 0),
                 "favorites_count": prompt.get("favorites_count", 0),
-                "created_at": (
-                    prompt.get("created_at").isoformat()
-                    if prompt.get("created_at")
-                    else None
-                ),
+                "created_at": prompt.get("created_at"),
                 "is_liked": is_liked,
                 "is_favorited": is_favorited,
             }
         else:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Serializing prompt document %s", prompt.id)
+
             if user_liked_prompts is not None:
                 is_liked = str(prompt.id) in user_liked_prompts
             if user_favorited_prompts is not None:
                 is_favorited = str(prompt.id) in user_favorited_prompts
 
+            author = prompt.author
+            if authors is not None and author:
+                author = authors.get(author.id)
+            language = prompt.language
+            if languages is not None and language:
+                language = languages.get(language.id)
+
             return {
                 "id": str(prompt.id),
                 "title": prompt.title,
@@ -102,35 +288,265 @@ def serialize_prompt(prompt, user_liked_prompts=None, user_favorited_prompts=Non
                 "status": prompt.status,
                 "author": (
                     {
-                        "id": str(prompt.author.id),
-                        "name": prompt.author.name,
-                        "avatar_url": prompt.author.avatar_url,
+                        "id": str(author.id),
+                        "name": author.name,
+                        "avatar_url": author.avatar_url,
                     }
-                    if prompt.author
+                    if author
                     else None
                 ),
                 "language": (
                     {
-                        "id": str(prompt.language.id),
-                        "name": prompt.language.name,
-                        "slug": prompt.language.slug,
+                        "id": str(language.id),
+                        "name": language.name,
+                        "slug": language.slug,
                     }
-                    if prompt.language
+                    if language
                     else None
                 ),
                 "likes_count": prompt.likes_count,
                 "favorites_count": prompt.favorites_count,
-                "created_at": prompt.created_at.isoformat(),
+                "created_at": prompt.created_at,
                 "is_liked": is_liked,
                 "is_favorited": is_favorited,
             }
-    except Exception as e:
-        print(f"序列化提示时出错: {str(e)}")
-        print(f"提示对象: {prompt}")
-        import traceback
+    except Exception:
+        logger.exception("Failed to serialize prompt %s", prompt_value(prompt, "id"))
+        return None
+
+
+def parse_prompt_fields():
+    """解析列表接口的 fields= 和 excerpt= 参数
+
+    返回 (输出字段集合, 摘要长度)，未指定时对应项为 None；
+    给出 excerpt= 时输出字段中总是包含 excerpt。
+    fields 中含有未知字段时抛出 ValueError。
+    """
+    excerpt = request.args.get("excerpt", type=int)
+    fields = request.args.get("fields")
+    if fields:
+        fields = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = fields - PROMPT_OUTPUT_FIELDS.keys()
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        fields.add("id")
+        if "excerpt" in fields and excerpt is None:
+            excerpt = EXCERPT_LENGTH
+        elif excerpt is not None:
+            # 显式给出 excerpt= 时总是输出摘要
+            fields.add("excerpt")
+    else:
+        fields = None
+    if excerpt is not None:
+        excerpt = min(max(excerpt, 1), MAX_EXCERPT_LENGTH)
+    return fields, excerpt
+
+
+def projected_fields(fields=None, excerpt=None, extra=()):
+    """请求的输出字段对应的文档字段，不需要投影时返回 None"""
+    if fields is None and excerpt is None:
+        return None
+    if fields is None:
+        fields = (PROMPT_OUTPUT_FIELDS.keys() - {"content"}) | {"excerpt"}
+    needed = {"created_at", *extra}
+    for field in fields:
+        needed.update(PROMPT_OUTPUT_FIELDS[field])
+    return needed
+
+
+def project_prompts(queryset, fields=None, excerpt=None, extra=()):
+    """把请求的输出字段下推为查询投影，extra 为排序等额外需要的字段"""
+    needed = projected_fields(fields, excerpt, extra)
+    if needed is None:
+        return queryset
+    return queryset.only(*needed)
+
+
+def excerpt_projection(fields=None, excerpt=None, extra=()):
+    """在查询中截取摘要时使用的 $project，不需要截取时返回 None
 
-        print(f"错误堆栈: {traceback.format_exc()}")
+    只要摘要、不要全文时由 $substrCP 在数据库中截取，不传输整个 content；
+    同时请求了 content 时全文本来就要取回，仍在 Python 中截取。
+    """
+    if excerpt is None or (fields is not None and "content" in fields):
         return None
+    project = {
+        Prompt._fields[field].db_field: 1
+        for field in projected_fields(fields, excerpt, extra) - {"content"}
+    }
+    project["excerpt"] = {"$substrCP": [{"$ifNull": ["$content", ""]}, 0, excerpt]}
+    return project
+
+
+def shape_prompt(data, fields=None, excerpt=None, excerpt_text=None):
+    """按 fields / excerpt 裁剪序列化后的提示词
+
+    excerpt_text 为查询中已截取的摘要，未给出时从 content 截取。
+    """
+    if data is None:
+        return None
+    if excerpt is not None:
+        if excerpt_text is None:
+            excerpt_text = (data.get("content") or "")[:excerpt]
+        data["excerpt"] = excerpt_text
+        if fields is None:
+            del data["content"]
+    if fields is not None:
+        data = {key: value for key, value in data.items() if key in fields}
+    return data
+
+
+def fetch_prompts(queryset, fields=None, excerpt=None, extra=()):
+    """执行提示词列表查询
+
+    开启 RAW_READ_PATH 时用 as_pymongo() 直接返回 BSON 字典，跳过 MongoEngine
+    文档构建，只要摘要时改用聚合在数据库中截取；关闭时返回文档，摘要在
+    Python 中截取，便于对比两条路径的延迟。fields / excerpt / extra 与
+    project_prompts 的参数一致。
+    """
+    if current_app.config.get("RAW_READ_PATH", True):
+        project = excerpt_projection(fields, excerpt, extra)
+        if project is not None:
+            # aggregate 沿用查询集的过滤、排序、skip 和 limit
+            return list(queryset.aggregate([{"$project": project}]))
+        return list(queryset.as_pymongo())
+    return list(queryset)
+
+
+def prompt_value(prompt, field):
+    """读取文档或原始字典形式的提示词字段"""
+    if isinstance(prompt, dict):
+        return prompt.get("_id" if field == "id" else field)
+    return getattr(prompt, field)
+
+
+def serialize_prompts(
+    prompts,
+    user_liked_prompts=None,
+    user_favorited_prompts=None,
+    fields=None,
+    excerpt=None,
+):
+    """批量序列化提示词列表
+
+    prompts 为 fetch_prompts() 的结果（文档应来自 no_dereference() 的查询），
+    作者和语言各用一次 $in 查询取回，每页的数据库往返次数与条数无关。
+    fields / excerpt 含义见 parse_prompt_fields。
+    """
+    prompts = list(prompts)
+    if prompts and isinstance(prompts[0], dict):
+        return serialize_raw_prompts(
+            prompts, user_liked_prompts, user_favorited_prompts, fields, excerpt
+        )
+
+    author_ids = {p.author.id for p in prompts if p.author}
+    language_ids = {p.language.id for p in prompts if p.language}
+
+    authors = {}
+    if author_ids:
+        authors = {
+            u.id: u
+            for u in User.objects(id__in=list(author_ids)).only(
+                "name", "email", "image"
+            )
+        }
+    languages = {}
+    if language_ids:
+        languages = {
+            lang.id: lang
+            for lang in Language.objects(id__in=list(language_ids)).only(
+                "name", "slug"
+            )
+        }
+
+    return [
+        shape_prompt(
+            serialize_prompt(
+                prompt, user_liked_prompts, user_favorited_prompts, authors, languages
+            ),
+            fields,
+            excerpt,
+        )
+        for prompt in prompts
+    ]
+
+
+def serialize_raw_prompts(
+    prompts,
+    user_liked_prompts=None,
+    user_favorited_prompts=None,
+    fields=None,
+    excerpt=None,
+):
+    """serialize_prompts 的原始字典版本，输出结构与文档路径完全一致"""
+    author_ids = {p["author"] for p in prompts if p.get("author")}
+    language_ids = {p["language"] for p in prompts if p.get("language")}
+
+    authors = {}
+    if author_ids:
+        authors = {
+            u["_id"]: {
+                "_id": u["_id"],
+                "name": u.get("name"),
+                "avatar_url": User.build_avatar_url(u["email"], u.get("image")),
+            }
+            for u in User.objects(id__in=list(author_ids))
+            .only("name", "email", "image")
+            .as_pymongo()
+        }
+    languages = {}
+    if language_ids:
+        languages = {
+            lang["_id"]: lang
+            for lang in Language.objects(id__in=list(language_ids))
+            .only("name", "slug")
+            .as_pymongo()
+        }
+
+    return [
+        shape_prompt(
+            serialize_prompt(
+                dict(
+                    prompt,
+                    author=authors.get(prompt.get("author")),
+                    language=languages.get(prompt.get("language")),
+                ),
+                user_liked_prompts,
+                user_favorited_prompts,
+            ),
+            fields,
+            excerpt,
+            prompt.get("excerpt"),
+        )
+        for prompt in prompts
+    ]
+
+
+def get_user_prompt_flags(user_id, prompt_ids):
+    """返回用户在给定提示词中点赞和收藏过的 id 集合
+
+    只查询当前页的提示词，点赞和收藏各一次投影查询，走 (user, prompt) 唯一索引，
+    不解引用。
+    """
+    prompt_ids = [str(pid) for pid in prompt_ids]
+    if not prompt_ids:
+        return set(), set()
+
+    liked = {
+        doc["prompt"]
+        for doc in Like.objects(user=user_id, prompt__in=prompt_ids)
+        .only("prompt")
+        .exclude("id")
+        .as_pymongo()
+    }
+    favorited = {
+        doc["prompt"]
+        for doc in Favorite.objects(user=user_id, prompt__in=prompt_ids)
+        .only("prompt")
+        .exclude("id")
+        .as_pymongo()
+    }
+    return liked, favorited
 
 
 def serialize_user(user):
@@ -141,7 +557,7 @@ def serialize_user(user):
         "email": user.email,
         "avatar_url": user.avatar_url,
         "role": user.role,
-        "created_at": user.created_at.isoformat(),
+        "created_at": user.created_at,
     }
 
 
@@ -156,11 +572,10 @@ def get_prompts():
             # 从 Authorization 头中提取 token
             token = auth_header.split(" ")[1]
             # 验证 token
-            user = User.verify_token(token)
+            user = load_token_user(token)
             if not user:
                 return jsonify({"message": "Invalid or expired token"}), 401
-            # 登录用户
-            login_user(user)
+            authenticate(user)
         except Exception as e:
             return jsonify({"message": "Invalid token format"}), 401
 
@@ -180,6 +595,7 @@ def get_prompts():
             author=current_user.id,
             status=PromptStatus.PUBLISHED,
         ).save()
+        after_prompt_saved(prompt)
 
         return (
             jsonify(
@@ -193,10 +609,36 @@ def get_prompts():
 
     try:
         # 获取查询参数
-        page = request.args.get("page", 1, type=int)
-        per_page = request.args.get("per_page", 12, type=int)  # 每页显示12个提示词
+        page = max(request.args.get("page", 1, type=int), 1)
+        per_page = clamp_per_page(
+            request.args.get("per_page", 12, type=int),  # 每页显示12个提示词
+            current_app.config["MAX_PER_PAGE"],
+        )
         language = request.args.get("language")
         prompt_type = request.args.get("type", "all")
+        cursor = request.args.get("cursor")
+        sort = "popular" if prompt_type == "popular" else "latest"
+        sort_fields = PROMPT_SORT_FIELDS[sort]
+        try:
+            fields, excerpt = parse_prompt_fields()
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+
+        # 匿名请求的结果与用户无关，可直接使用缓存
+        cache_key = None
+        if not current_user.is_authenticated:
+            cache_key = (
+                sort,
+                language,
+                page,
+                per_page,
+                cursor,
+                frozenset(fields) if fields else None,
+                excerpt,
+            )
+            body = prompt_list_cache.get(cache_key)
+            if body is not None:
+                return current_app.response_class(body, mimetype="application/json")
 
         # 构建查询条件
         query = Q(status=PromptStatus.PUBLISHED)
@@ -205,102 +647,323 @@ def get_prompts():
             if lang:
                 query &= Q(language=lang.id)
 
-        # 获取总数
-        total = Prompt.objects(query).count()
-
         # 根据类型排序
-        if prompt_type == "popular":
-            prompts = Prompt.objects(query).order_by("-likes_count", "-created_at")
-        else:
-            prompts = Prompt.objects(query).order_by("-created_at")
+        prompts = project_prompts(
+            Prompt.objects(query)
+            .order_by(*(f"-{f}" for f in sort_fields))
+            .no_dereference(),
+            fields,
+            excerpt,
+            extra=sort_fields,
+        )
 
-        # 应用分页
-        prompts = prompts.skip((page - 1) * per_page).limit(per_page)
+        if cursor:
+            # 游标模式：沿复合索引定位，不做 skip 也不统计总数
+            try:
+                values = decode_cursor(cursor, sort, sort_fields)
+            except InvalidCursor:
+                return jsonify({"message": "Invalid cursor"}), 400
+            prompts = prompts.filter(seek_query(sort_fields, values))
+            total = None
+        else:
+            # 获取总数
+            total = Prompt.objects(query).count()
+            # 应用分页
+            prompts = prompts.skip((page - 1) * per_page)
+
+        # 多取一条用于判断是否还有下一页
+        prompts = fetch_prompts(
+            prompts.limit(per_page + 1), fields, excerpt, extra=sort_fields
+        )
+        has_next = len(prompts) > per_page
+        prompts = prompts[:per_page]
 
-        # 获取当前用户的点赞和收藏数据
+        # 获取当前用户对本页提示词的点赞和收藏状态
         user_liked_prompts = set()
         user_favorited_prompts = set()
-        if current_user.is_authenticated:
-            user_liked_prompts = {
-                str(like.prompt.id) for like in Like.objects(user=current_user.id)
-            }
-            user_favorited_prompts = {
-                str(favorite.prompt.id)
-                for favorite in Favorite.objects(user=current_user.id)
-            }
+        wants_flags = fields is None or {"is_liked", "is_favorited"} & fields
+        if current_user.is_authenticated and wants_flags:
+            user_liked_prompts, user_favorited_prompts = get_user_prompt_flags(
+                current_user.id, [prompt_value(p, "id") for p in prompts]
+            )
 
         # 序列化提示词
-        prompts_data = [
-            serialize_prompt(prompt, user_liked_prompts, user_favorited_prompts)
-            for prompt in prompts
-        ]
+        prompts_data = serialize_prompts(
+            prompts, user_liked_prompts, user_favorited_prompts, fields, excerpt
+        )
 
         # 构建分页信息
-        pagination = {
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "total_pages": (total + per_page - 1) // per_page,
-            "has_prev": page > 1,
-            "has_next": page * per_page < total,
-        }
+        next_cursor = cursor_for(prompts[-1], sort) if has_next else None
+        if cursor:
+            pagination = {
+                "per_page": per_page,
+                "has_next": has_next,
+                "next_cursor": next_cursor,
+            }
+        else:
+            pagination = {
+                "total": total,
+                "page": page,
+                "per_page": per_page,
+                "total_pages": (total + per_page - 1) // per_page,
+                "has_prev": page > 1,
+                "has_next": has_next,
+                "next_cursor": next_cursor,
+            }
 
-        return jsonify({"prompts": prompts_data, "pagination": pagination})
+        response = jsonify({"prompts": prompts_data, "pagination": pagination})
+        if cache_key is not None:
+            prompt_list_cache.set(cache_key, response.get_data())
+        return response
 
-    except Exception as e:
-        print(f"Error: {str(e)}")
+    except Exception:
+        logger.exception("Error fetching prompts")
         return jsonify({"message": "Failed to fetch prompts"}), 500
 
 
-@api.route("/languages")
-def get_languages():
-    languages = Language.objects.order_by("-popularity")
+def text_search_hits(q, limit, match, after=None):
+    """用 MongoDB 全文索引搜索，返回按相关度排序的命中"""
+    pipeline = [
+        {"$match": dict(match, **{"$text": {"$search": q}})},
+        {
+            "$project": {
+                "title": 1,
+                "excerpt": {"$substrCP": ["$content", 0, EXCERPT_LENGTH]},
+                "score": {"$meta": "textScore"},
+            }
+        },
+    ]
+    if after is not None:
+        score, last_id = after
+        pipeline.append(
+            {
+                "$match": {
+                    "$or": [
+                        {"score": {"$lt": score}},
+                        {"score": score, "_id": {"$lt": last_id}},
+                    ]
+                }
+            }
+        )
+    pipeline += [
+        {"$sort": {"score": -1, "_id": -1}},
+        {"$limit": limit},
+    ]
+    return list(Prompt.objects.aggregate(pipeline))
+
+
+def index_search_hits(q, limit, match, after=None):
+    """用内存 BM25 索引搜索，再一次查询取回本页的标题和摘要
+
+    索引同步前已被删除或下线的提示词会被跳过并从索引中移除，
+    之后从最后一条排名继续取，直到凑满 limit 条或排名用尽。
+    """
+    hits, missing = [], []
+    while len(hits) < limit:
+        want = limit - len(hits)
+        ranked = search_index.search(
+            q, want, match.get("language"), match.get("type"), after
+        )
+        if not ranked:
+            break
+
+        pipeline = [
+            {
+                "$match": {
+                    "_id": {"$in": [prompt_id for _, prompt_id in ranked]},
+                    "status": PromptStatus.PUBLISHED.value,
+                }
+            },
+            {
+                "$project": {
+                    "title": 1,
+                    "excerpt": {"$substrCP": ["$content", 0, EXCERPT_LENGTH]},
+                }
+            },
+        ]
+        docs = {doc["_id"]: doc for doc in Prompt.objects.aggregate(pipeline)}
+
+        # 按排名顺序返回
+        for score, prompt_id in ranked:
+            if prompt_id in docs:
+                hits.append(dict(docs[prompt_id], score=score))
+            else:
+                missing.append(prompt_id)
+        if len(ranked) < want:
+            break
+        after = ranked[-1]
+
+    # 取完再移除，避免本次请求中途的分数变化影响续取的位置
+    for prompt_id in missing:
+        search_index.remove(prompt_id)
+    return hits
+
+
+@api.route("/prompts/search")
+def search_prompts():
+    """全文搜索提示词，按相关度排序并使用游标分页"""
+    q = request.args.get("q", "").strip()
+    if not q:
+        return jsonify({"message": "Missing search query"}), 400
+
+    per_page = clamp_per_page(
+        request.args.get("per_page", 12, type=int), current_app.config["MAX_PER_PAGE"]
+    )
+    language = request.args.get("language")
+    prompt_type = request.args.get("type")
+    status = request.args.get("status", PromptStatus.PUBLISHED.value)
+    cursor = request.args.get("cursor")
+
+    # 只有管理员可以搜索未发布的提示词
+    if status != PromptStatus.PUBLISHED.value and not (
+        current_user.is_authenticated and current_user.is_admin
+    ):
+        return jsonify({"message": "Admin permission required"}), 403
+
+    try:
+        match = {"status": PromptStatus(status).value}
+        if prompt_type:
+            match["type"] = PromptType(prompt_type).value
+    except ValueError:
+        return jsonify({"message": "Invalid status or type"}), 400
+
+    if language:
+        lang = Language.objects(slug=language).only("id").first()
+        if lang:
+            match["language"] = lang.id
+
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, "relevance", ["score", "id"])
+        except InvalidCursor:
+            return jsonify({"message": "Invalid cursor"}), 400
 
-    # 计算每个语言的提示词数量
-    language_counts = {}
-    for language in languages:
-        language_counts[str(language.id)] = Prompt.objects(
-            language=language, status=PromptStatus.PUBLISHED
-        ).count()
+    try:
+        # 内存索引只包含已发布的提示词，未就绪时退回 MongoDB 全文索引
+        if status == PromptStatus.PUBLISHED.value and search_index.ensure_ready():
+            hits = index_search_hits(q, per_page + 1, match, after)
+        else:
+            hits = text_search_hits(q, per_page + 1, match, after)
+    except Exception:
+        logger.exception("Error searching prompts")
+        return jsonify({"message": "Failed to search prompts"}), 500
+
+    has_next = len(hits) > per_page
+    hits = hits[:per_page]
+    next_cursor = (
+        encode_cursor("relevance", [hits[-1]["score"], hits[-1]["_id"]])
+        if has_next
+        else None
+    )
 
     return jsonify(
         {
-            "languages": [
+            "prompts": [
                 {
-                    "id": str(lang.id),
-                    "name": lang.name,
-                    "slug": lang.slug,
-                    "popularity": lang.popularity,
-                    "prompts_count": language_counts[str(lang.id)],
+                    "id": str(hit["_id"]),
+                    "title": hit.get("title"),
+                    "excerpt": hit.get("excerpt"),
+                    "score": hit["score"],
                 }
-                for lang in languages
+                for hit in hits
+            ],
+            "pagination": {
+                "per_page": per_page,
+                "has_next": has_next,
+                "next_cursor": next_cursor,
+            },
+        }
+    )
+
+
+@api.route("/prompts/suggest")
+def suggest_prompts():
+    """按前缀补全提示词标题和语言名称"""
+    prefix = request.args.get("prefix", "")
+    limit = request.args.get("limit", 10, type=int)
+
+    # 索引首次构建期间返回空结果，不退回到逐字正则查询
+    if not suggest_index.ensure_ready():
+        return jsonify({"suggestions": []})
+
+    return jsonify({"suggestions": suggest_index.suggest(prefix, limit)})
+
+
+@api.route("/languages")
+def get_languages():
+    # 每种语言的提示词数量来自物化的统计快照
+    stats = prompt_stats.get()
+    etag = "languages-" + stats["version"]
+    response = not_modified(etag)
+    if response is not None:
+        return response
+
+    response = jsonify(
+        {
+            "languages": [
+                dict(lang, prompts_count=stats["counts"].get(lang["id"], 0))
+                for lang in stats["languages"]
             ],
-            "total_prompts": Prompt.objects(status=PromptStatus.PUBLISHED).count(),
+            "total_prompts": stats["total_count"],
         }
     )
+    return cache_headers(response, etag)
+
+
+def toggle_membership(model, counter, prompt_id):
+    """切换当前用户对提示词的点赞/收藏关系，并原子地更新计数
+
+    先依赖 (user, prompt) 唯一索引直接插入关系，已存在时改为删除；
+    计数用一次 $inc 更新，不读取也不整体保存提示词，并发点击不会丢失更新。
+    开启写后缓冲时计数增量交给 counter_buffer 批量写回。
+    返回 (切换后是否处于点赞/收藏状态, 最新计数)，提示词不存在时返回 (None, None)。
+    """
+    if counter_buffer.enabled:
+        stored = Prompt.objects(id=prompt_id).only(counter).as_pymongo().first()
+        if stored is None:
+            return None, None
+
+    try:
+        model(user=current_user.id, prompt=prompt_id).save(force_insert=True)
+        is_member, delta = True, 1
+    except NotUniqueError:
+        deleted = model.objects(user=current_user.id, prompt=prompt_id).delete()
+        is_member, delta = False, -deleted
+
+    if counter_buffer.enabled:
+        pending = counter_buffer.add(prompt_id, counter, delta)
+        return is_member, max(0, stored.get(counter, 0) + pending)
+
+    prompt = (
+        Prompt.objects(id=prompt_id)
+        .only(counter)
+        .modify(new=True, **{f"inc__{counter}": delta})
+    )
+    if prompt is None:
+        # 提示词不存在，撤销刚插入的关系
+        if is_member:
+            model.objects(user=current_user.id, prompt=prompt_id).delete()
+        return None, None
+
+    return is_member, getattr(prompt, counter)
 
 
 @api.route("/prompts/<prompt_id>/like", methods=["POST"])
 @jwt_required
 def toggle_like(prompt_id):
     try:
-        prompt = Prompt.objects(id=prompt_id).first_or_404()
-        like = Like.objects(user=current_user.id, prompt=prompt_id).first()
+        is_liked, likes_count = toggle_membership(Like, "likes_count", prompt_id)
+        if is_liked is None:
+            return jsonify({"message": "Prompt not found"}), 404
 
-        if like:
-            like.delete()
-            prompt.likes_count = max(0, prompt.likes_count - 1)
-        else:
-            Like(user=current_user.id, prompt=prompt_id).save()
-            prompt.likes_count += 1
-
-        prompt.save()
+        invalidate_prompt_lists(sort="popular")
 
         return jsonify(
             {
                 "message": "Like toggled successfully",
-                "is_liked": like is None,
-                "likes_count": prompt.likes_count,
+                "is_liked": is_liked,
+                "likes_count": likes_count,
             }
         )
     except Exception as e:
@@ -311,23 +974,17 @@ def toggle_like(prompt_id):
 @jwt_required
 def toggle_favorite(prompt_id):
     try:
-        prompt = Prompt.objects(id=prompt_id).first_or_404()
-        favorite = Favorite.objects(user=current_user.id, prompt=prompt_id).first()
-
-        if favorite:
-            favorite.delete()
-            prompt.favorites_count = max(0, prompt.favorites_count - 1)
-        else:
-            Favorite(user=current_user.id, prompt=prompt_id).save()
-            prompt.favorites_count += 1
-
-        prompt.save()
+        is_favorited, favorites_count = toggle_membership(
+            Favorite, "favorites_count", prompt_id
+        )
+        if is_favorited is None:
+            return jsonify({"message": "Prompt not found"}), 404
 
         return jsonify(
             {
                 "message": "Favorite toggled successfully",
-                "is_favorited": favorite is None,
-                "favorites_count": prompt.favorites_count,
+                "is_favorited": is_favorited,
+                "favorites_count": favorites_count,
             }
         )
     except Exception as e:
@@ -336,102 +993,245 @@ def toggle_favorite(prompt_id):
 
 @api.route("/prompts/<prompt_id>", methods=["GET"])
 def get_prompt(prompt_id):
-    prompt = Prompt.objects(id=prompt_id, status=PromptStatus.PUBLISHED).first_or_404()
+    # 先只读取生成 ETag 所需的字段，命中时不再加载和序列化整个提示词
+    version = (
+        Prompt.objects(id=prompt_id, status=PromptStatus.PUBLISHED)
+        .only("updated_at", "likes_count", "favorites_count")
+        .as_pymongo()
+        .first_or_404()
+    )
 
     # 获取用户的点赞和收藏状态
-    if current_user.is_authenticated:
-        current_user.liked_prompts = {
-            str(like.prompt.id) for like in Like.objects(user=current_user.id)
-        }
-        current_user.favorited_prompts = {
-            str(fav.prompt.id) for fav in Favorite.objects(user=current_user.id)
-        }
+    user_liked_prompts = set()
+    user_favorited_prompts = set()
+    private = current_user.is_authenticated
+    if private:
+        user_liked_prompts, user_favorited_prompts = get_user_prompt_flags(
+            current_user.id, [prompt_id]
+        )
+
+    etag = "{}-{}-{}-{}".format(
+        prompt_id,
+        version["updated_at"].timestamp() if version.get("updated_at") else 0,
+        version.get("likes_count", 0),
+        version.get("favorites_count", 0),
+    )
+    if private:
+        etag += "-{:d}{:d}".format(
+            prompt_id in user_liked_prompts, prompt_id in user_favorited_prompts
+        )
+    response = not_modified(etag, private)
+    if response is not None:
+        return response
 
-    return jsonify({"prompt": serialize_prompt(prompt)})
+    prompt = Prompt.objects(id=prompt_id, status=PromptStatus.PUBLISHED).first_or_404()
+    response = jsonify(
+        {
+            "prompt": serialize_prompt(
+                prompt, user_liked_prompts, user_favorited_prompts
+            )
+        }
+    )
+    return cache_headers(response, etag, private)
 
 
 @api.route("/user/profile")
 @login_required
 def get_user_profile():
-    return jsonify({"user": serialize_user(current_user)})
+    # 无状态模式下 current_user 来自 token 声明，不含注册时间
+    return jsonify({"user": serialize_user(User.get_snapshot(current_user.get_id()))})
 
 
 @api.route("/user/prompts")
 @login_required
 def get_user_prompts():
-    prompts = Prompt.objects(author=current_user.id).order_by("-created_at")
+    try:
+        fields, excerpt = parse_prompt_fields()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    per_page = clamp_per_page(
+        request.args.get("per_page", 12, type=int), current_app.config["MAX_PER_PAGE"]
+    )
+    sort_fields = PROMPT_SORT_FIELDS["latest"]
+    prompts = project_prompts(
+        Prompt.objects(author=current_user.id)
+        .order_by(*(f"-{f}" for f in sort_fields))
+        .no_dereference(),
+        fields,
+        excerpt,
+        extra=sort_fields,
+    )
+
+    # 游标分页，沿 (author, -created_at, -id) 索引定位
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            values = decode_cursor(cursor, "latest", sort_fields)
+        except InvalidCursor:
+            return jsonify({"message": "Invalid cursor"}), 400
+        prompts = prompts.filter(seek_query(sort_fields, values))
+
+    # 多取一条用于判断是否还有下一页
+    prompts = fetch_prompts(
+        prompts.limit(per_page + 1), fields, excerpt, extra=sort_fields
+    )
+    has_next = len(prompts) > per_page
+    prompts = prompts[:per_page]
 
     # 获取用户的点赞和收藏状态
-    current_user.liked_prompts = {
-        str(like.prompt.id) for like in Like.objects(user=current_user.id)
-    }
-    current_user.favorited_prompts = {
-        str(fav.prompt.id) for fav in Favorite.objects(user=current_user.id)
-    }
+    liked, favorited = get_user_prompt_flags(current_user.id, [prompt_value(p, "id") for p in prompts])
 
-    return jsonify({"prompts": [serialize_prompt(p) for p in prompts]})
+    return jsonify(
+        {
+            "prompts": serialize_prompts(prompts, liked, favorited, fields, excerpt),
+            "pagination": {
+                "per_page": per_page,
+                "has_next": has_next,
+                "next_cursor": cursor_for(prompts[-1], "latest") if has_next else None,
+            },
+        }
+    )
 
 
-@api.route("/user/likes")
-@login_required
-def get_user_likes():
-    liked_prompt_ids = [like.prompt.id for like in Like.objects(user=current_user.id)]
-    prompts = Prompt.objects(id__in=liked_prompt_ids).order_by("-created_at")
+def membership_prompts(model):
+    """当前用户点赞/收藏的提示词，按点赞/收藏时间倒序，游标分页
 
-    # 获取用户的点赞和收藏状态
-    current_user.liked_prompts = {str(p.id) for p in prompts}
-    current_user.favorited_prompts = {
-        str(fav.prompt.id) for fav in Favorite.objects(user=current_user.id)
-    }
+    一次聚合完成：在 (user, -created_at, -id) 索引上定位本页的关系记录，
+    再 $lookup 取回提示词并只投影需要输出的字段。
+    游标为上一页最后一条关系记录的 (created_at, id)。
+    """
+    try:
+        fields, excerpt = parse_prompt_fields()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
 
-    return jsonify({"prompts": [serialize_prompt(p) for p in prompts]})
+    per_page = clamp_per_page(
+        request.args.get("per_page", 12, type=int), current_app.config["MAX_PER_PAGE"]
+    )
+    sort = model._get_collection_name()
+    match = {"user": current_user.id}
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor, sort, ["created_at", "id"])
+        except InvalidCursor:
+            return jsonify({"message": "Invalid cursor"}), 400
+        match["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]
 
+    project = {"created_at": 1, "prompt": 1}
+    needed = projected_fields(fields, excerpt)
+    if needed is not None:
+        project = {"created_at": 1, "prompt._id": 1}
+        project.update({f"prompt.{field}": 1 for field in needed})
+        excerpt_project = excerpt_projection(fields, excerpt)
+        if excerpt_project is not None:
+            # 只要摘要时在数据库中截取，不取回 content
+            del project["prompt.content"]
+            project["excerpt"] = {
+                "$substrCP": [{"$ifNull": ["$prompt.content", ""]}, 0, excerpt]
+            }
 
-@api.route("/user/favorites")
-@login_required
-def get_user_favorites():
-    favorited_prompt_ids = [
-        fav.prompt.id for fav in Favorite.objects(user=current_user.id)
+    # 多取一条用于判断是否还有下一页
+    rows = list(
+        model.objects.aggregate(
+            [
+                {"$match": match},
+                {"$sort": {"created_at": -1, "_id": -1}},
+                {"$limit": per_page + 1},
+                {
+                    "$lookup": {
+                        "from": Prompt._get_collection_name(),
+                        "localField": "prompt",
+                        "foreignField": "_id",
+                        "as": "prompt",
+                    }
+                },
+                # 提示词已删除时保留关系记录，保证游标位置正确
+                {"$unwind": {"path": "$prompt", "preserveNullAndEmptyArrays": True}},
+                {"$project": project},
+            ]
+        )
+    )
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = (
+        encode_cursor(sort, [rows[-1]["created_at"], rows[-1]["_id"]])
+        if has_next
+        else None
+    )
+
+    # 跳过指向已删除提示词的关系记录
+    prompts = [
+        dict(row["prompt"], excerpt=row["excerpt"]) if "excerpt" in row else row["prompt"]
+        for row in rows
+        if "prompt" in row
     ]
-    prompts = Prompt.objects(id__in=favorited_prompt_ids).order_by("-created_at")
 
     # 获取用户的点赞和收藏状态
-    current_user.liked_prompts = {
-        str(like.prompt.id) for like in Like.objects(user=current_user.id)
-    }
-    current_user.favorited_prompts = {str(p.id) for p in prompts}
+    liked, favorited = get_user_prompt_flags(current_user.id, [p["_id"] for p in prompts])
 
-    return jsonify({"prompts": [serialize_prompt(p) for p in prompts]})
+    return jsonify(
+        {
+            "prompts": serialize_prompts(prompts, liked, favorited, fields, excerpt),
+            "pagination": {
+                "per_page": per_page,
+                "has_next": has_next,
+                "next_cursor": next_cursor,
+            },
+        }
+    )
+
+
+@api.route("/user/likes")
+@login_required
+def get_user_likes():
+    return membership_prompts(Like)
+
+
+@api.route("/user/favorites")
+@login_required
+def get_user_favorites():
+    return membership_prompts(Favorite)
 
 
 @api.route("/user/settings", methods=["PUT"])
 @login_required
 def update_user_settings():
     data = request.get_json()
+    # current_user 是只读快照，修改需要取出完整文档
+    user = User.objects(id=current_user.id).first_or_404()
 
     # 验证邮箱是否已被使用
-    if data.get("email") and data["email"] != current_user.email:
+    if data.get("email") and data["email"] != user.email:
         if User.objects(email=data["email"]).first():
             return jsonify({"message": "Email already exists"}), 400
 
     # 更新基本信息
     if data.get("name"):
-        current_user.name = data["name"]
+        user.name = data["name"]
     if data.get("email"):
-        current_user.email = data["email"]
+        user.email = data["email"]
 
     # 更新密码
     if data.get("current_password") and data.get("new_password"):
-        if not current_user.check_password(data["current_password"]):
-            return jsonify({"message": "Current password is incorrect"}), 400
-        current_user.set_password(data["new_password"])
+        try:
+            if not user.check_password(data["current_password"]):
+                return jsonify({"message": "Current password is incorrect"}), 400
+            user.set_password(data["new_password"])
+        except HasherBusy:
+            return hasher_busy_response()
 
-    current_user.save()
+    user.save()
+    user_cache.pop(str(user.id))
 
     return jsonify(
         {
             "message": "Settings updated successfully",
-            "user": serialize_user(current_user),
+            "user": serialize_user(user),
         }
     )
 
@@ -505,91 +1305,126 @@ def remove_avatar():
 @jwt_required
 @admin_required
 def admin_get_prompts():
-    """获取所有提示词（管理员）"""
+    """获取提示词列表（管理员）
+
+    点赞和收藏数直接读取存储的计数字段，需要校正时调用 recount 接口。
+    status 按审核状态筛选，走 status_created_at_id 索引。
+    """
     try:
         # 获取分页参数
-        page = request.args.get("page", 1, type=int)
-        per_page = request.args.get("per_page", 20, type=int)
+        page = max(request.args.get("page", 1, type=int), 1)
+        per_page = clamp_per_page(
+            request.args.get("per_page", 20, type=int),
+            current_app.config["MAX_PER_PAGE"],
+        )
+        cursor = request.args.get("cursor")
+        sort_fields = PROMPT_SORT_FIELDS["latest"]
+        try:
+            fields, excerpt = parse_prompt_fields()
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+
+        query = Q()
+        status = request.args.get("status")
+        if status:
+            try:
+                query = Q(status=PromptStatus(status))
+            except ValueError:
+                return jsonify({"message": "Invalid status"}), 400
+
+        prompts = project_prompts(
+            Prompt.objects(query)
+            .order_by(*(f"-{f}" for f in sort_fields))
+            .no_dereference(),
+            fields,
+            excerpt,
+            extra=sort_fields,
+        )
 
-        # 获取总数
-        total = Prompt.objects.count()
+        if cursor:
+            # 游标模式：沿索引定位，不做 skip 也不统计总数
+            try:
+                values = decode_cursor(cursor, "latest", sort_fields)
+            except InvalidCursor:
+                return jsonify({"message": "Invalid cursor"}), 400
+            prompts = prompts.filter(seek_query(sort_fields, values))
+            total = None
+        else:
+            # 获取总数
+            total = Prompt.objects(query).count()
+            prompts = prompts.skip((page - 1) * per_page)
 
-        # 获取分页后的提示词
-        prompts = (
-            Prompt.objects.order_by("-created_at")
-            .skip((page - 1) * per_page)
-            .limit(per_page)
+        # 多取一条用于判断是否还有下一页
+        prompts = fetch_prompts(
+            prompts.limit(per_page + 1), fields, excerpt, extra=sort_fields
         )
+        has_next = len(prompts) > per_page
+        prompts = prompts[:per_page]
 
-        # 一次性获取所有点赞和收藏数据
-        if current_user.is_authenticated:
-            # 预先获取所有点赞和收藏数据
-            likes_map = {
-                str(like.prompt.id): True for like in Like.objects(user=current_user.id)
-            }
-            favorites_map = {
-                str(fav.prompt.id): True
-                for fav in Favorite.objects(user=current_user.id)
-            }
+        # 一次性获取本页的点赞和收藏状态
+        liked, favorited = get_user_prompt_flags(
+            current_user.id, [prompt_value(p, "id") for p in prompts]
+        )
 
-            # 为每个提示词计算点赞和收藏数
-            prompts_likes = {str(p.id): Like.objects(prompt=p).count() for p in prompts}
-            prompts_favorites = {
-                str(p.id): Favorite.objects(prompt=p).count() for p in prompts
+        next_cursor = cursor_for(prompts[-1], "latest") if has_next else None
+        if cursor:
+            pagination = {
+                "per_page": per_page,
+                "has_next": has_next,
+                "next_cursor": next_cursor,
             }
-
-        # 序列化提示词数据
-        serialized_prompts = []
-        for prompt in prompts:
-            prompt_data = {
-                "id": str(prompt.id),
-                "title": prompt.title,
-                "content": prompt.content,
-                "status": prompt.status,
-                "author": (
-                    {
-                        "id": str(prompt.author.id),
-                        "name": prompt.author.name,
-                        "avatar_url": prompt.author.avatar_url,
-                    }
-                    if prompt.author
-                    else None
-                ),
-                "language": (
-                    {
-                        "id": str(prompt.language.id),
-                        "name": prompt.language.name,
-                        "slug": prompt.language.slug,
-                    }
-                    if prompt.language
-                    else None
-                ),
-                "likes_count": prompts_likes.get(str(prompt.id), 0),
-                "favorites_count": prompts_favorites.get(str(prompt.id), 0),
-                "created_at": prompt.created_at.isoformat(),
-                "is_liked": likes_map.get(str(prompt.id), False),
-                "is_favorited": favorites_map.get(str(prompt.id), False),
+        else:
+            pagination = {
+                "page": page,
+                "per_page": per_page,
+                "total": total,
+                "pages": (total + per_page - 1) // per_page,
+                "has_next": has_next,
+                "has_prev": page > 1,
+                "next_cursor": next_cursor,
             }
-            serialized_prompts.append(prompt_data)
 
         return jsonify(
             {
-                "prompts": serialized_prompts,
-                "pagination": {
-                    "page": page,
-                    "per_page": per_page,
-                    "total": total,
-                    "pages": (total + per_page - 1) // per_page,
-                    "has_next": page * per_page < total,
-                    "has_prev": page > 1,
-                },
+                "prompts": serialize_prompts(prompts, liked, favorited, fields, excerpt),
+                "pagination": pagination,
             }
         )
-    except Exception as e:
-        print(f"Error fetching admin prompts: {str(e)}")
+    except Exception:
+        logger.exception("Error fetching admin prompts")
         return jsonify({"message": "Failed to fetch prompts"}), 500
 
 
+@api.route("/admin/prompts/<prompt_id>/recount", methods=["POST"])
+@jwt_required
+@admin_required
+def admin_recount_prompt(prompt_id):
+    """按点赞和收藏关系重新统计提示词的计数（管理员）"""
+    prompt = (
+        Prompt.objects(id=prompt_id)
+        .only("likes_count", "favorites_count", "language")
+        .first()
+    )
+    if prompt is None:
+        return jsonify({"message": "Prompt not found"}), 404
+    # 先写回本 worker 缓冲的增量，避免校正后再次累加
+    if counter_buffer.enabled:
+        counter_buffer.flush()
+    old_counts = (prompt.likes_count, prompt.favorites_count)
+    prompt.update_counts()
+    if (prompt.likes_count, prompt.favorites_count) != old_counts:
+        invalidate_prompt_lists(*language_slugs(prompt))
+        prompt_stats.invalidate()
+
+    return jsonify(
+        {
+            "message": "Prompt counts updated successfully",
+            "likes_count": prompt.likes_count,
+            "favorites_count": prompt.favorites_count,
+        }
+    )
+
+
 @api.route("/admin/prompts/<prompt_id>/status", methods=["PUT"])
 @jwt_required
 @admin_required
@@ -608,6 +1443,7 @@ def admin_update_prompt_status(prompt_id):
 
     prompt.status = new_status
     prompt.save()
+    after_prompt_saved(prompt)
 
     # 创建审核记录
     if new_status in [PromptStatus.PUBLISHED, PromptStatus.REJECTED]:
@@ -629,6 +1465,88 @@ def admin_update_prompt_status(prompt_id):
     )
 
 
+@api.route("/admin/prompts/bulk-status", methods=["POST"])
+@jwt_required
+@admin_required
+def admin_bulk_update_prompt_status():
+    """批量更新提示词状态（管理员）
+
+    一次 update_many 修改状态，一次 insert_many 写入审核记录，
+    返回每个 id 的处理结果：updated / unchanged / not_found。
+    """
+    data = request.get_json() or {}
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, str) for i in ids):
+        return jsonify({"message": "ids must be a non-empty list of prompt ids"}), 400
+    ids = list(dict.fromkeys(ids))
+    max_ids = current_app.config["BULK_STATUS_MAX_IDS"]
+    if len(ids) > max_ids:
+        return jsonify({"message": f"At most {max_ids} ids per request"}), 400
+
+    try:
+        new_status = PromptStatus(data.get("status"))
+    except ValueError:
+        return jsonify({"message": "Invalid status"}), 400
+
+    current = {
+        doc["_id"]: doc.get("status")
+        for doc in Prompt.objects(id__in=ids).only("status").as_pymongo()
+    }
+    to_update = [i for i in ids if i in current and current[i] != new_status.value]
+
+    if to_update:
+        Prompt.objects(id__in=to_update).update(
+            set__status=new_status, set__updated_at=get_utc_now()
+        )
+
+        # 创建审核记录
+        if new_status in [PromptStatus.PUBLISHED, PromptStatus.REJECTED]:
+            review_status = (
+                ReviewStatus.PUBLISHED
+                if new_status == PromptStatus.PUBLISHED
+                else ReviewStatus.REJECTED
+            )
+            Review.objects.insert(
+                [
+                    Review(
+                        prompt=prompt_id,
+                        reviewer=current_user.id,
+                        status=review_status,
+                        comment=data.get("comment"),
+                    )
+                    for prompt_id in to_update
+                ],
+                load_bulk=False,
+            )
+
+        after_prompts_updated(
+            list(
+                Prompt.objects(id__in=to_update)
+                .only("title", "content", "type", "status", "language", "likes_count")
+                .select_related()
+            )
+        )
+
+    updated = set(to_update)
+    return jsonify(
+        {
+            "message": "Prompt statuses updated successfully",
+            "updated": len(updated),
+            "results": [
+                {
+                    "id": prompt_id,
+                    "outcome": "updated"
+                    if prompt_id in updated
+                    else "unchanged"
+                    if prompt_id in current
+                    else "not_found",
+                }
+                for prompt_id in ids
+            ],
+        }
+    )
+
+
 @api.route("/admin/prompts/<prompt_id>", methods=["PUT"])
 @jwt_required
 @admin_required
@@ -652,10 +1570,12 @@ def admin_update_prompt(prompt_id):
             return jsonify({"error": "Invalid language"}), 400
 
         # 更新提示词
+        old_slugs = language_slugs(prompt)
         prompt.title = data["title"]
         prompt.content = data["content"]
         prompt.language = language
         prompt.save()
+        after_prompt_saved(prompt, *old_slugs)
 
         return (
             jsonify(
@@ -675,38 +1595,136 @@ def admin_update_prompt(prompt_id):
 @jwt_required
 @admin_required
 def admin_delete_prompt(prompt_id):
-    """删除提示词（管理员）"""
+    """删除提示词（管理员），关联数据在后台清理"""
     try:
-        # 查找提示词
-        prompt = Prompt.objects(id=prompt_id).first()
-        if not prompt:
+        job, prompts = delete_prompts([prompt_id])
+        if not prompts:
             return jsonify({"error": "Prompt not found"}), 404
 
-        # 删除相关的点赞记录
-        Like.objects(prompt=prompt).delete()
+        return (
+            jsonify(
+                {
+                    "message": "Prompt deleted successfully",
+                    "job": serialize_delete_job(job),
+                }
+            ),
+            200,
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error deleting prompt: {str(e)}")
+        return jsonify({"error": "Failed to delete prompt"}), 500
+
 
-        # 删除相关的收藏记录
-        Favorite.objects(prompt=prompt).delete()
+@api.route("/admin/prompts/bulk-delete", methods=["POST"])
+@jwt_required
+@admin_required
+def admin_bulk_delete_prompts():
+    """批量删除提示词（管理员）
+
+    提示词立即删除，关联数据由后台任务分批清理，
+    进度通过 GET /admin/delete-jobs/<job_id> 查询。
+    """
+    data = request.get_json() or {}
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, str) for i in ids):
+        return jsonify({"message": "ids must be a non-empty list of prompt ids"}), 400
+    ids = list(dict.fromkeys(ids))
+    max_ids = current_app.config["BULK_DELETE_MAX_IDS"]
+    if len(ids) > max_ids:
+        return jsonify({"message": f"At most {max_ids} ids per request"}), 400
+
+    job, prompts = delete_prompts(ids)
+    deleted = {p.id for p in prompts}
+    return (
+        jsonify(
+            {
+                "message": "Prompts deleted, cleanup scheduled",
+                "job": serialize_delete_job(job) if job else None,
+                "results": [
+                    {
+                        "id": prompt_id,
+                        "outcome": "deleted" if prompt_id in deleted else "not_found",
+                    }
+                    for prompt_id in ids
+                ],
+            }
+        ),
+        202 if job else 200,
+    )
 
-        # 删除相关的审核记录
-        Review.objects(prompt=prompt).delete()
 
-        # 删除提示词
-        prompt.delete()
+@api.route("/admin/delete-jobs/<job_id>")
+@jwt_required
+@admin_required
+def admin_get_delete_job(job_id):
+    """查询清理任务的进度（管理员）"""
+    job = DeleteJob.objects(id=job_id).first()
+    if job is None:
+        return jsonify({"message": "Job not found"}), 404
+    # 顺带确保本 worker 的清理线程在运行，接手中断的任务
+    cascade_deleter.ensure_worker()
+    return jsonify({"job": serialize_delete_job(job)})
+
 
-        return jsonify({"message": "Prompt deleted successfully"}), 200
-    except Exception as e:
-        current_app.logger.error(f"Error deleting prompt: {str(e)}")
-        return jsonify({"error": "Failed to delete prompt"}), 500
+@api.route("/admin/cache/stats")
+@jwt_required
+@admin_required
+def admin_get_cache_stats():
+    """获取进程内缓存命中统计（管理员）"""
+    return jsonify(
+        {
+            "prompt_list_cache": prompt_list_cache.stats(),
+            "user_cache": user_cache.stats(),
+        }
+    )
 
 
 @api.route("/admin/users")
 @jwt_required
 @admin_required
 def admin_get_users():
-    """获取所有用户（管理员）"""
-    users = User.objects.order_by("-created_at")
-    return jsonify({"users": [serialize_user(u) for u in users]})
+    """获取用户列表（管理员），按注册时间倒序，游标分页
+
+    q 按邮箱或名称前缀筛选（区分大小写，可使用 email / name 索引）。
+    """
+    per_page = clamp_per_page(
+        request.args.get("per_page", 20, type=int), current_app.config["MAX_PER_PAGE"]
+    )
+    sort_fields = ["created_at", "id"]
+    users = User.objects.order_by("-created_at", "-id").only(
+        "name", "email", "image", "role", "created_at"
+    )
+
+    q = request.args.get("q", "").strip()
+    if q:
+        users = users.filter(Q(email__startswith=q) | Q(name__startswith=q))
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            values = decode_cursor(cursor, "users", sort_fields)
+        except InvalidCursor:
+            return jsonify({"message": "Invalid cursor"}), 400
+        users = users.filter(seek_query(sort_fields, values))
+
+    # 多取一条用于判断是否还有下一页
+    users = list(users.limit(per_page + 1))
+    has_next = len(users) > per_page
+    users = users[:per_page]
+    next_cursor = (
+        encode_cursor("users", [users[-1].created_at, users[-1].id]) if has_next else None
+    )
+
+    return jsonify(
+        {
+            "users": [serialize_user(u) for u in users],
+            "pagination": {
+                "per_page": per_page,
+                "has_next": has_next,
+                "next_cursor": next_cursor,
+            },
+        }
+    )
 
 
 @api.route("/admin/users/<user_id>/role", methods=["PUT"])
@@ -727,6 +1745,9 @@ def admin_update_user_role(user_id):
 
     user.role = new_role
     user.save()
+    user_cache.pop(str(user.id))
+    # token 中的角色声明已过期，需重新登录
+    token_revocations.revoke(str(user.id))
 
     return jsonify(
         {"message": "User role updated successfully", "user": serialize_user(user)}
@@ -737,43 +1758,38 @@ def admin_update_user_role(user_id):
 def get_prompts_stats():
     """获取提示词的统计信息，包括总数和每种语言的数量"""
     try:
-        # 获取所有已发布的提示词总数
-        total_count = Prompt.objects(status=PromptStatus.PUBLISHED).count()
+        stats = prompt_stats.get()
+        etag = "stats-" + stats["version"]
+        response = not_modified(etag)
+        if response is not None:
+            return response
 
         # 按语言分组统计数量
-        language_stats = []
-        for language in Language.objects.all():
-            count = Prompt.objects(
-                status=PromptStatus.PUBLISHED, language=language.id
-            ).count()
-            if count > 0:  # 只返回有提示词的语言
-                language_stats.append(
-                    {
-                        "id": str(language.id),
-                        "name": language.name,
-                        "slug": language.slug,
-                        "count": count,
-                    }
-                )
+        language_stats = [
+            {
+                "id": lang["id"],
+                "name": lang["name"],
+                "slug": lang["slug"],
+                "count": stats["counts"][lang["id"]],
+            }
+            for lang in stats["languages"]
+            if stats["counts"].get(lang["id"], 0) > 0  # 只返回有提示词的语言
+        ]
 
         # 按数量降序排序
         language_stats.sort(key=lambda x: x["count"], reverse=True)
 
-        # 获取热门提示词数量（likes_count >= 10）
-        popular_count = Prompt.objects(
-            status=PromptStatus.PUBLISHED, likes_count__gte=10
-        ).count()
-
-        return jsonify(
+        response = jsonify(
             {
-                "total_count": total_count,
-                "popular_count": popular_count,
+                "total_count": stats["total_count"],
+                "popular_count": stats["popular_count"],
                 "language_stats": language_stats,
             }
         )
+        return cache_headers(response, etag)
 
     except Exception as e:
-        print(f"Error getting prompts stats: {str(e)}")
+        logger.exception("Error getting prompts stats")
         return jsonify({"message": "Failed to get prompts stats", "error": str(e)}), 500
 
 
@@ -803,10 +1819,12 @@ def update_prompt(prompt_id):
             return jsonify({"error": "Invalid language"}), 400
 
         # 更新提示词
+        old_slugs = language_slugs(prompt)
         prompt.title = data["title"]
         prompt.content = data["content"]
         prompt.language = language
         prompt.save()
+        after_prompt_saved(prompt, *old_slugs)
 
         return (
             jsonify(
@@ -1,9 +1,19 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, g
+from flask.sessions import SecureCookieSessionInterface
 from flask_login import login_user, logout_user, login_required, current_user
 from .models import User
+from .tokens import token_revocations
+from .hashing import HasherBusy
 from functools import wraps
+import logging
 
 auth = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
+
+def hasher_busy_response():
+    response = jsonify({'message': 'Server is busy, please try again later'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 def admin_required(f):
     @wraps(f)
@@ -13,6 +23,37 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def load_token_user(token):
+    """验证 token 并返回用户快照
+
+    无状态模式（JWT_STATELESS）下直接由声明构造用户，只查内存中的版本表；
+    缺少角色声明的旧 token 仍按用户 id 读取。
+    """
+    if not current_app.config.get('JWT_STATELESS'):
+        return User.verify_token(token)
+    payload = User.decode_token(token)
+    if not payload:
+        return None
+    if 'role' not in payload:
+        return User.get_snapshot(payload['user_id'])
+    if token_revocations.is_revoked(payload['user_id'], payload.get('ver', 0)):
+        return None
+    return User.snapshot_from_claims(payload)
+
+class HeaderAuthSessionInterface(SecureCookieSessionInterface):
+    """通过 Authorization 头认证的请求不写 session cookie"""
+
+    def save_session(self, *args, **kwargs):
+        if g.get('login_via_header'):
+            return
+        return super().save_session(*args, **kwargs)
+
+def authenticate(user):
+    """把用户绑定到当前请求，无状态模式下不写 session cookie"""
+    if current_app.config.get('JWT_STATELESS'):
+        g.login_via_header = True
+    login_user(user)
+
 def jwt_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -24,11 +65,11 @@ def jwt_required(f):
             # 从 Authorization 头中提取 token
             token = auth_header.split(' ')[1]
             # 验证 token
-            user = User.verify_token(token)
+            user = load_token_user(token)
             if not user:
                 return jsonify({'message': 'Invalid or expired token'}), 401
             # 登录用户
-            login_user(user)
+            authenticate(user)
             return f(*args, **kwargs)
         except Exception as e:
             return jsonify({'message': 'Invalid token format'}), 401
@@ -82,8 +123,10 @@ def register():
                 'role': user.role
             }
         })
-    except Exception as e:
-        print(f"Registration error: {str(e)}")
+    except HasherBusy:
+        return hasher_busy_response()
+    except Exception:
+        logger.exception("Registration error")
         return jsonify({'message': 'Registration failed'}), 500
 
 @auth.route('/login', methods=['POST', 'OPTIONS'])
@@ -106,6 +149,12 @@ def login():
                 'message': 'Invalid email or password'
             }), 401
         
+        # 旧参数生成的哈希顺带升级，线程池繁忙时下次登录再升级
+        try:
+            user.upgrade_password_hash(data['password'])
+        except HasherBusy:
+            pass
+        
         # 登录用户
         login_user(user, remember=data.get('remember', False))
         
@@ -123,13 +172,17 @@ def login():
                 'role': user.role
             }
         })
-    except Exception as e:
-        print(f"Login error: {str(e)}")
+    except HasherBusy:
+        return hasher_busy_response()
+    except Exception:
+        logger.exception("Login error")
         return jsonify({'message': 'Login failed'}), 500
 
 @auth.route('/logout', methods=['POST'])
 @jwt_required
 def logout():
+    # 递增 token 版本，无状态模式下该用户已签发的 token 随之失效
+    token_revocations.revoke(current_user.get_id())
     logout_user()
     return jsonify({
         'message': 'Logout successful'
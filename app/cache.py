@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """进程内的 LRU + TTL 响应缓存
+
+    每个 worker 各自持有一份，写操作只能失效本进程内的条目，
+    其他 worker 中的旧数据最多保留 TTL 秒。
+    """
+
+    def __init__(self, maxsize=512, ttl=60, enabled=True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, prefix):
+        self.enabled = app.config.get(f"{prefix}_ENABLED", self.enabled)
+        self.maxsize = app.config.get(f"{prefix}_SIZE", self.maxsize)
+        self.ttl = app.config.get(f"{prefix}_TTL", self.ttl)
+        self.clear()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        """删除单个条目"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, predicate=None):
+        """删除满足 predicate(key) 的条目，不传 predicate 时清空"""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# 匿名用户的提示词列表缓存，键为
+# (sort, language, page, per_page, cursor, fields, excerpt)，
+# fields 为 frozenset 或 None，与 get_prompts 中构建的键一致
+prompt_list_cache = ResponseCache()
+
+# 认证用的用户快照缓存，键为用户 id
+user_cache = ResponseCache(maxsize=4096, ttl=30)
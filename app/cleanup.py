@@ -0,0 +1,129 @@
+import logging
+import os
+import threading
+from datetime import timedelta
+from .models import (
+    Prompt,
+    Like,
+    Favorite,
+    Review,
+    DeleteJob,
+    DeleteJobStatus,
+    get_utc_now,
+)
+
+logger = logging.getLogger(__name__)
+
+# 需要随提示词清理的关联集合，沿各自的 prompt 索引分批删除
+CASCADE_MODELS = (("likes", Like), ("favorites", Favorite), ("reviews", Review))
+
+
+class CascadeDeleter:
+    """后台分批清理已删除提示词的点赞、收藏和审核记录
+
+    任务保存在 delete_jobs 集合中，用 modify 认领，每批删除后更新进度，
+    进度可以在任意 worker 中查询。超过 stale_after 秒未更新的 RUNNING
+    任务视为原处理进程已退出，会被重新认领；删除操作是幂等的。
+    """
+
+    def __init__(self, batch_size=1000, poll_interval=30, stale_after=300):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.batch_size = app.config.get("CASCADE_DELETE_BATCH_SIZE", self.batch_size)
+        self.poll_interval = app.config.get(
+            "CASCADE_DELETE_POLL_INTERVAL", self.poll_interval
+        )
+        self.stale_after = app.config.get("CASCADE_DELETE_STALE_AFTER", self.stale_after)
+
+    def submit(self, prompt_ids, user_id=None):
+        """删除提示词并创建清理任务，返回任务"""
+        job = DeleteJob(prompt_ids=list(prompt_ids), requested_by=user_id).save()
+        Prompt.objects(id__in=job.prompt_ids).delete()
+        self.ensure_worker()
+        self._wakeup.set()
+        return job
+
+    def ensure_worker(self):
+        # gunicorn fork 出的 worker 不会继承线程，按进程启动
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="cascade-delete", daemon=True
+            )
+            self._thread.start()
+
+    def run_pending(self):
+        """处理所有可认领的任务，返回处理的任务数"""
+        count = 0
+        while True:
+            job = self._claim()
+            if job is None:
+                return count
+            self._process(job)
+            count += 1
+
+    def _claim(self):
+        stale = get_utc_now() - timedelta(seconds=self.stale_after)
+        for query in (
+            {"status": DeleteJobStatus.PENDING},
+            {"status": DeleteJobStatus.RUNNING, "updated_at__lt": stale},
+        ):
+            job = (
+                DeleteJob.objects(**query)
+                .order_by("updated_at")
+                .modify(
+                    new=True,
+                    set__status=DeleteJobStatus.RUNNING,
+                    set__updated_at=get_utc_now(),
+                )
+            )
+            if job is not None:
+                return job
+        return None
+
+    def _process(self, job):
+        # 提示词已在请求中删除，这里再删一次以防创建任务后进程中断
+        Prompt.objects(id__in=job.prompt_ids).delete()
+        for name, model in CASCADE_MODELS:
+            while True:
+                ids = list(
+                    model.objects(prompt__in=job.prompt_ids)
+                    .limit(self.batch_size)
+                    .scalar("id")
+                )
+                if not ids:
+                    break
+                deleted = model.objects(id__in=ids).delete()
+                # 更新进度，同时作为心跳
+                DeleteJob.objects(id=job.id).update_one(
+                    **{f"inc__deleted__{name}": deleted},
+                    set__updated_at=get_utc_now(),
+                )
+        DeleteJob.objects(id=job.id).update_one(
+            set__status=DeleteJobStatus.DONE,
+            set__finished_at=get_utc_now(),
+            set__updated_at=get_utc_now(),
+        )
+
+    def _run(self):
+        while True:
+            try:
+                self.run_pending()
+            except Exception:
+                logger.exception("Cascade delete failed, will retry")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+cascade_deleter = CascadeDeleter()
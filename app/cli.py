@@ -1,8 +1,26 @@
 from flask.cli import with_appcontext
 import click
+from .cache import user_cache
+from .tokens import token_revocations
 from .models import User, Prompt, Language, Like, Favorite, Review, UserRole, PromptStatus, ReviewStatus, PromptType
-from pymongo import MongoClient
-from flask import current_app
+from pymongo import UpdateOne
+
+# 已被新索引取代的旧索引，由 drop-stale-indexes 从现有数据库中删除
+SUPERSEDED_INDEXES = {
+    'prompts': [
+        # 由末尾带 -id 的 status_created_at_id 等键集分页索引取代
+        'status_created_at',
+        'status_language_created',
+        'status_likes',
+        # 单字段 -created_at 索引，是 created_at_id 的前缀
+        'created_at_-1',
+        # 单字段 author 索引，是 author_created_id 的前缀
+        'author_1',
+    ],
+    # 原来的单字段 user 索引，是 user_created_id 的前缀
+    'likes': ['user_1'],
+    'favorites': ['user_1'],
+}
 
 def init_cli(app):
     @app.cli.command('set-admin')
@@ -17,6 +35,10 @@ def init_cli(app):
         
         user.role = 'ADMIN'
         user.save()
+        # 只能失效当前进程的缓存，运行中的 worker 在 USER_CACHE_TTL 秒后生效；
+        # 旧 token 中的角色声明随版本递增失效
+        user_cache.pop(str(user.id))
+        token_revocations.revoke(str(user.id))
         click.echo(f'User {user.name} ({user.email}) is now an admin')
 
     @app.cli.command('list-admins')
@@ -52,10 +74,8 @@ def init_cli(app):
     def rebuild_indexes():
         """重建数据库索引"""
         try:
-            # 获取 MongoDB 连接
-            client = MongoClient(current_app.config['MONGODB_SETTINGS']['host'])
-            db_name = current_app.config['MONGODB_SETTINGS']['db']
-            db_instance = client[db_name]
+            # 使用应用已建立的连接，数据库名以 MONGODB_URI 中的为准
+            db_instance = Prompt._get_db()
 
             # 删除所有集合的索引
             collections = ['prompts', 'languages', 'users', 'likes', 'favorites']
@@ -99,103 +119,131 @@ def init_cli(app):
             print(f"重建索引时发生错误: {str(e)}")
             raise click.ClickException('重建索引失败')
 
+    @click.command('drop-stale-indexes')
+    @click.option('--dry-run', is_flag=True, help='只列出将被删除的索引')
+    @with_appcontext
+    def drop_stale_indexes(dry_run):
+        """创建缺失的索引，再删除已被新索引取代的旧索引
+
+        与 rebuild-indexes 不同，不会删除仍在使用的索引，可以在线执行。
+        """
+        db_instance = Prompt._get_db()
+        if not dry_run:
+            # 先建新索引，保证删除旧索引期间查询仍有索引可用
+            for model in (Prompt, Language, User, Like, Favorite):
+                model.ensure_indexes()
+
+        for collection, names in SUPERSEDED_INDEXES.items():
+            existing = db_instance[collection].index_information()
+            for name in names:
+                if name not in existing:
+                    continue
+                if dry_run:
+                    click.echo(f'将删除 {collection}.{name}')
+                else:
+                    db_instance[collection].drop_index(name)
+                    click.echo(f'已删除 {collection}.{name}')
+        click.echo('完成')
+
     @click.command('update-counts')
+    @click.option('--dry-run', is_flag=True, help='只报告计数偏差，不写入数据库')
+    @click.option('--batch-size', default=1000, show_default=True, help='每次 bulk_write 的更新条数')
     @with_appcontext
-    def update_counts():
-        """更新所有提示的点赞和收藏计数"""
+    def update_counts(dry_run, batch_size):
+        """更新所有提示的点赞和收藏计数
+
+        点赞和收藏各用一次 $group 聚合统计，只更新与实际数量不一致的提示词，
+        同时按已发布提示词数和点赞数更新语言热度；索引保持不变。
+        可在线运行：更新时以读到的旧计数为条件，统计之后计数又有变化的提示词
+        会被跳过并报告，不会覆盖期间发生的点赞和收藏，可再次运行修正。
+        """
+        def write_counts(batch):
+            """按旧计数条件写入新计数，返回被跳过的提示词 id"""
+            result = Prompt._get_collection().bulk_write([
+                UpdateOne(
+                    {'_id': prompt_id, 'likes_count': old_likes, 'favorites_count': old_favs},
+                    {'$set': {'likes_count': likes_count, 'favorites_count': favorites_count}}
+                )
+                for prompt_id, old_likes, old_favs, likes_count, favorites_count in batch
+            ], ordered=False)
+            if result.matched_count == len(batch):
+                return []
+            expected = {row[0]: (row[3], row[4]) for row in batch}
+            current = Prompt.objects(id__in=list(expected)).only('likes_count', 'favorites_count').as_pymongo()
+            return [
+                doc['_id'] for doc in current
+                if (doc.get('likes_count', 0), doc.get('favorites_count', 0)) != expected[doc['_id']]
+            ]
+
         try:
-            # 首先删除索引
-            print("删除现有索引...")
-            # 获取 MongoDB 连接信息
-            mongodb_settings = current_app.config.get('MONGODB_SETTINGS', {})
-            if not mongodb_settings:
-                print("无法获取 MongoDB 配置信息")
-                return
-            
-            # 构建 MongoDB URI
-            host = mongodb_settings.get('host', 'localhost')
-            port = mongodb_settings.get('port', 27017)
-            db_name = mongodb_settings.get('db', 'cwbeauty')
-            
-            if 'mongodb://' not in host:
-                uri = f"mongodb://{host}:{port}"
-            else:
-                uri = host
-            
-            print(f"连接到数据库: {uri}")
-            client = MongoClient(uri)
-            db_instance = client[db_name]
-            
-            collections = ['prompts', 'languages', 'users', 'likes', 'favorites']
-            for collection in collections:
-                try:
-                    print(f"正在删除 {collection} 的索引...")
-                    db_instance[collection].drop_indexes()
-                    print(f"成功删除 {collection} 的索引")
-                except Exception as e:
-                    print(f"删除 {collection} 索引时出错: {str(e)}")
+            # 按提示词统计实际的点赞和收藏数
+            click.echo('统计点赞和收藏数...')
+            group = [{'$group': {'_id': '$prompt', 'count': {'$sum': 1}}}]
+            likes = {row['_id']: row['count'] for row in Like.objects.aggregate(group, allowDiskUse=True)}
+            favorites = {row['_id']: row['count'] for row in Favorite.objects.aggregate(group, allowDiskUse=True)}
 
-            # 更新计数
-            print("\n开始更新提示计数...")
-            prompts = Prompt.objects.all()
-            total = prompts.count()
-            
+            prompts = Prompt.objects.only('likes_count', 'favorites_count', 'language', 'status').as_pymongo()
+            total = Prompt.objects.count()
+            click.echo(f'检查 {total} 个提示词...')
+
+            batch = []
+            drifted = 0
+            skipped = []
+            popularity = {}
             for i, prompt in enumerate(prompts, 1):
-                old_likes = prompt.likes_count
-                old_favs = prompt.favorites_count
-                
-                # 计算点赞和收藏数
-                likes_count = Like.objects(prompt=prompt).count()
-                favorites_count = Favorite.objects(prompt=prompt).count()
-                
-                # 更新计数
-                prompt.likes_count = likes_count
-                prompt.favorites_count = favorites_count
-                prompt.save()
-                
-                print(f"更新进度: [{i}/{total}] ID: {prompt.id}")
-                print(f"  点赞: {old_likes} -> {likes_count}")
-                print(f"  收藏: {old_favs} -> {favorites_count}")
-            
-            print("\n所有提示计数更新完成！")
+                likes_count = likes.get(prompt['_id'], 0)
+                favorites_count = favorites.get(prompt['_id'], 0)
+                old_likes = prompt.get('likes_count', 0)
+                old_favs = prompt.get('favorites_count', 0)
+
+                if (old_likes, old_favs) != (likes_count, favorites_count):
+                    drifted += 1
+                    if dry_run:
+                        click.echo(f'  {prompt["_id"]}: 点赞 {old_likes} -> {likes_count}，收藏 {old_favs} -> {favorites_count}')
+                    else:
+                        # 条件中使用读到的原值，字段缺失时为 None，可匹配缺失的字段
+                        batch.append((
+                            prompt['_id'], prompt.get('likes_count'), prompt.get('favorites_count'),
+                            likes_count, favorites_count
+                        ))
+
+                # 语言热度 = 已发布提示词数 + 这些提示词的总点赞数
+                if prompt.get('status') == PromptStatus.PUBLISHED.value and prompt.get('language'):
+                    popularity[prompt['language']] = popularity.get(prompt['language'], 0) + 1 + likes_count
+
+                if len(batch) >= batch_size:
+                    skipped += write_counts(batch)
+                    batch = []
+                if i % batch_size == 0:
+                    click.echo(f'进度: [{i}/{total}]，计数不一致: {drifted}')
+
+            if batch:
+                skipped += write_counts(batch)
+            for prompt_id in skipped:
+                click.echo(f'  {prompt_id}: 统计后计数已变化，已跳过')
+            click.echo(
+                f'提示计数检查完成: {total} 个提示词中 {drifted} 个计数不一致'
+                + ('' if dry_run else f'，已更新 {drifted - len(skipped)} 个，跳过 {len(skipped)} 个')
+            )
 
             # 更新语言的热度
-            print("\n开始更新语言热度...")
-            languages = Language.objects.all()
-            for language in languages:
-                # 计算该语言下已发布的提示词数量
-                prompts_count = Prompt.objects(language=language, status=PromptStatus.PUBLISHED).count()
-                # 计算该语言下所有提示词的总点赞数
-                total_likes = sum(p.likes_count for p in Prompt.objects(language=language, status=PromptStatus.PUBLISHED))
-                # 计算热度值（可以根据需要调整计算方式）
-                language.popularity = prompts_count + total_likes
-                language.save()
-                print(f"语言 {language.name} 热度更新为: {language.popularity}")
-
-            print("\n所有语言热度更新完成！")
-
-            # 重新创建索引
-            print("\n开始重新创建索引...")
-            
-            print("创建 Prompt 索引...")
-            Prompt.ensure_indexes()
-            
-            print("创建 Language 索引...")
-            Language.ensure_indexes()
-            
-            print("创建 User 索引...")
-            User.ensure_indexes()
-            
-            print("创建 Like 索引...")
-            Like.ensure_indexes()
-            
-            print("创建 Favorite 索引...")
-            Favorite.ensure_indexes()
+            language_updates = []
+            for language in Language.objects.only('name', 'popularity').as_pymongo():
+                new_popularity = popularity.get(language['_id'], 0)
+                if language.get('popularity', 0) != new_popularity:
+                    click.echo(f'语言 {language.get("name")} 热度: {language.get("popularity", 0)} -> {new_popularity}')
+                    language_updates.append(UpdateOne(
+                        {'_id': language['_id']}, {'$set': {'popularity': new_popularity}}
+                    ))
+            if language_updates and not dry_run:
+                Language._get_collection().bulk_write(language_updates, ordered=False)
+            click.echo(f'语言热度检查完成: {len(language_updates)} 种语言需要更新' + ('' if dry_run else '，已更新'))
+
+            if dry_run:
+                click.echo('dry-run 模式，未写入任何数据')
 
-            print("所有操作完成！")
-            
         except Exception as e:
-            print(f"操作时发生错误: {str(e)}")
+            click.echo(f'操作时发生错误: {str(e)}')
             raise click.ClickException('操作失败')
 
     @click.command('migrate-to-enums')
@@ -242,5 +290,6 @@ def init_cli(app):
         click.echo('迁移完成！')
 
     app.cli.add_command(rebuild_indexes)
+    app.cli.add_command(drop_stale_indexes)
     app.cli.add_command(update_counts)
     app.cli.add_command(migrate_to_enums) 
\ No newline at end of file
@@ -0,0 +1,84 @@
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只使用 gzip
+    brotli = None
+
+# 流式压缩时每次送入压缩器的数据块大小
+CHUNK_SIZE = 64 * 1024
+
+
+def gzip_compressor(level):
+    # wbits=31 输出带 gzip 头的数据
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def brotli_compressor(level):
+    compressor = brotli.Compressor(quality=level)
+    return compressor.process, compressor.finish
+
+
+def compress_chunks(chunks, compress, finish):
+    for chunk in chunks:
+        for start in range(0, len(chunk), CHUNK_SIZE):
+            data = compress(chunk[start:start + CHUNK_SIZE])
+            if data:
+                yield data
+    yield finish()
+
+
+def init_compression(app):
+    """按 Accept-Encoding 协商 br / gzip 压缩响应
+
+    小于 COMPRESS_MIN_SIZE 的响应不压缩；超过 COMPRESS_STREAM_THRESHOLD
+    的响应边压缩边发送，不在内存中生成完整的压缩结果。
+    """
+    encodings = {"gzip": (gzip_compressor, app.config.get("COMPRESS_LEVEL", 6))}
+    if brotli is not None:
+        encodings["br"] = (brotli_compressor, app.config.get("COMPRESS_BR_LEVEL", 4))
+    # 客户端同等接受时优先 br
+    preferred = [name for name in ("br", "gzip") if name in encodings]
+    mimetypes = set(app.config.get("COMPRESS_MIMETYPES", ["application/json"]))
+    min_size = app.config.get("COMPRESS_MIN_SIZE", 1024)
+    stream_threshold = app.config.get("COMPRESS_STREAM_THRESHOLD", 256 * 1024)
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code == 304:
+            response.vary.add("Accept-Encoding")
+            return response
+        if response.mimetype not in mimetypes:
+            return response
+        response.vary.add("Accept-Encoding")
+
+        if (
+            response.direct_passthrough
+            or response.status_code < 200
+            or response.status_code == 204
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        size = response.calculate_content_length()
+        if size is not None and size < min_size:
+            return response
+        encoding = request.accept_encodings.best_match(preferred)
+        if encoding is None:
+            return response
+
+        compressor, level = encodings[encoding]
+        compress, finish = compressor(level)
+        if size is None or size > stream_threshold:
+            response.response = compress_chunks(response.iter_encoded(), compress, finish)
+            response.headers.pop("Content-Length", None)
+        else:
+            response.set_data(compress(response.get_data()) + finish())
+
+        response.headers["Content-Encoding"] = encoding
+        # 强 ETag 要区分不同编码，弱 ETag 按语义等价可以保留
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
+        return response
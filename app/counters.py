@@ -0,0 +1,125 @@
+import atexit
+import logging
+import os
+import threading
+from collections import defaultdict
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, ServerSelectionTimeoutError
+from .models import Prompt
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """点赞/收藏计数的写后缓冲
+
+    开启后，切换操作只立即写入点赞/收藏关系，计数增量先在本 worker 内存中累积，
+    由后台线程每隔 flush_interval 秒用一次 bulk_write 的 $inc 批量写回；
+    待写条目超过 max_pending 时提前写回，进程退出时也会写回。
+    写回失败时只重试确定没有执行的增量；无法确定时丢弃，宁可少计也不重复计数。
+    """
+
+    def __init__(self, enabled=False, flush_interval=2.0, max_pending=10000):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.enabled = app.config.get("COUNTER_WRITE_BEHIND", self.enabled)
+        # 写回间隔限制在 [0.1, 60] 秒内，保证计数的延迟有上界
+        self.flush_interval = min(
+            max(app.config.get("COUNTER_FLUSH_INTERVAL", self.flush_interval), 0.1),
+            60.0,
+        )
+        self.max_pending = app.config.get("COUNTER_MAX_PENDING", self.max_pending)
+        if self.enabled:
+            atexit.register(self.flush)
+
+    def add(self, prompt_id, counter, delta):
+        """累积一次计数变化，返回该计数在本 worker 中尚未写回的增量"""
+        self._ensure_worker()
+        with self._lock:
+            counters = self._pending[prompt_id]
+            counters[counter] += delta
+            pending = counters[counter]
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.set()
+        return pending
+
+    def flush(self):
+        """把累积的增量写回数据库"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+
+        increments = []
+        for prompt_id, counters in pending.items():
+            inc = {counter: delta for counter, delta in counters.items() if delta}
+            if inc:
+                increments.append((prompt_id, inc))
+        if not increments:
+            return 0
+
+        operations = [
+            UpdateOne({"_id": prompt_id}, {"$inc": inc}) for prompt_id, inc in increments
+        ]
+        try:
+            Prompt._get_collection().bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # 无序写入时其余操作已经生效，只重试报错的那几条
+            failed = [
+                increments[error["index"]] for error in e.details.get("writeErrors", ())
+            ]
+            logger.error(
+                "Failed to flush %d of %d counter deltas, will retry",
+                len(failed),
+                len(operations),
+            )
+            self._requeue(failed)
+            return len(operations) - len(failed)
+        except ServerSelectionTimeoutError:
+            # 没有连上服务器，批次未发出，可以整体重试
+            logger.exception("Failed to flush counter deltas, will retry")
+            self._requeue(increments)
+            return 0
+        except Exception:
+            # 连接中断等情况下服务器可能已经执行了批次，重试会重复计数，
+            # 宁可少计也不重复 $inc，偏差由 update-counts 修正
+            logger.exception(
+                "Failed to flush %d counter deltas, dropping them", len(operations)
+            )
+            return 0
+        return len(operations)
+
+    def _requeue(self, increments):
+        """把未写回的增量合并回缓冲区，等待下次写回"""
+        with self._lock:
+            for prompt_id, inc in increments:
+                for counter, delta in inc.items():
+                    self._pending[prompt_id][counter] += delta
+
+    def _ensure_worker(self):
+        # gunicorn 预加载后 fork 出的 worker 不会继承线程，按进程启动
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="counter-flush", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+counter_buffer = CounterBuffer()
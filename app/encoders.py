@@ -0,0 +1,42 @@
+from datetime import date
+from enum import Enum
+from flask.json import JSONEncoder as FlaskJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+class JSONEncoder(FlaskJSONEncoder):
+    """标准库 JSON 编码器：日期时间输出 ISO 格式，枚举输出其值"""
+
+    def default(self, o):
+        if isinstance(o, date):
+            return o.isoformat()
+        if isinstance(o, Enum):
+            return o.value
+        return super().default(o)
+
+
+class ORJSONEncoder(JSONEncoder):
+    """使用 orjson 编码，datetime、枚举和 UUID 由 orjson 原生处理
+
+    输出内容与 JSONEncoder 一致，只是非 ASCII 字符不再转义。
+    """
+
+    def encode(self, o):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(o, default=self.default, option=option).decode()
+
+
+def init_json(app):
+    """按 Config.JSON_BACKEND 选择编码器，orjson 未安装时退回标准库"""
+    if app.config.get("JSON_BACKEND") == "orjson" and orjson is not None:
+        app.json_encoder = ORJSONEncoder
+    else:
+        app.json_encoder = JSONEncoder
@@ -0,0 +1,93 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """密码哈希线程池已满或等待超时"""
+
+
+class PasswordHasher:
+    """有界的密码哈希线程池
+
+    哈希计算刻意设计得很慢，登录高峰时不加限制会占满所有 worker。
+    这里每个进程最多同时计算 workers 个哈希、排队 max_pending 个，超出时立即
+    抛出 HasherBusy，由接口返回 503，不再继续占用请求线程。
+    hashlib 计算期间会释放 GIL，不影响同进程内其他线程处理读请求。
+    限制只在 gunicorn gthread worker 下有意义：sync worker 每个进程同一时间
+    只有一个请求，信号量永远不会满。
+    """
+
+    def __init__(
+        self,
+        method="pbkdf2:sha256:260000",
+        salt_length=16,
+        workers=2,
+        max_pending=4,
+        timeout=10,
+    ):
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._prefix = None
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config.get("PASSWORD_HASH_METHOD", self.method)
+        self.salt_length = app.config.get("PASSWORD_HASH_SALT_LENGTH", self.salt_length)
+        self.workers = app.config.get("PASSWORD_HASH_WORKERS", self.workers)
+        self.max_pending = app.config.get("PASSWORD_HASH_MAX_PENDING", self.max_pending)
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT", self.timeout)
+        self._prefix = None
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """哈希是否由旧的算法、迭代次数或盐长度生成"""
+        if self._prefix is None:
+            # 由 werkzeug 补全默认迭代次数，与存储格式保持一致
+            self._prefix = generate_password_hash("", self.method, 1).split("$", 1)[0]
+        method, _, rest = pwhash.partition("$")
+        salt = rest.split("$", 1)[0]
+        return method != self._prefix or len(salt) != self.salt_length
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HasherBusy()
+
+    def _get_executor(self):
+        # gunicorn fork 出的 worker 不会继承线程，按进程创建线程池
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="password-hash"
+                    )
+        return self._executor
+
+
+password_hasher = PasswordHasher()
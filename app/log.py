@@ -0,0 +1,75 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from flask.logging import default_handler
+
+LOG_FORMAT = "[%(asctime)s] %(levelname)s in %(name)s: %(message)s"
+
+_listener = None
+
+
+class DebugSampler(logging.Filter):
+    """对 DEBUG 日志按 logger 限流，每秒最多放行 rate 条，其余丢弃
+
+    逐条数据的调试日志（如序列化每个提示词）在开启 DEBUG 时也不会淹没输出。
+    """
+
+    def __init__(self, rate=10):
+        super().__init__()
+        self.rate = rate
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or not self.rate:
+            return True
+        now = int(time.monotonic())
+        with self._lock:
+            window, count = self._windows.get(record.name, (now, 0))
+            if window != now:
+                window, count = now, 0
+            self._windows[record.name] = (window, count + 1)
+        return count < self.rate
+
+
+def init_logging(app):
+    """把 app 包下所有 logger 的输出经由队列交给后台线程写出
+
+    请求线程只把日志记录放进内存队列，不做同步 I/O。
+    LOG_LEVEL 为默认级别，LOG_LEVELS 可按 logger 名称单独设置级别。
+    """
+    global _listener
+
+    logger = logging.getLogger(app.import_name)
+    logger.setLevel(app.config.get("LOG_LEVEL", "INFO"))
+    for name, level in app.config.get("LOG_LEVELS", {}).items():
+        logging.getLogger(name).setLevel(level)
+
+    if _listener is not None:
+        _listener.stop()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.removeHandler(default_handler)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(DebugSampler(app.config.get("LOG_DEBUG_SAMPLE_RATE", 10)))
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
@@ -1,13 +1,15 @@
 from datetime import datetime, timezone
 from flask_mongoengine import MongoEngine
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 import hashlib
 import jwt
 from datetime import datetime, timedelta
 from flask import current_app
 from enum import Enum
+from collections import namedtuple
+from .cache import user_cache
+from .hashing import password_hasher
 
 db = MongoEngine()
 
@@ -31,6 +33,11 @@ class ReviewStatus(str, Enum):
     PUBLISHED = 'PUBLISHED'
     REJECTED = 'REJECTED'
 
+class DeleteJobStatus(str, Enum):
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+
 class BaseDocument(db.Document):
     meta = {'abstract': True}
     
@@ -50,10 +57,19 @@ class User(UserMixin, BaseDocument):
     image = db.StringField()
     password_hash = db.StringField()
     role = db.EnumField(UserRole, default=UserRole.USER)
+    # 递增后该用户之前签发的 token 全部失效（无状态认证模式）
+    token_version = db.IntField(default=0)
+    tokens_revoked_at = db.DateTimeField()
 
     meta = {
         'collection': 'users',
-        'indexes': ['email']
+        'indexes': [
+            'email',
+            # 管理后台按名称前缀筛选、按注册时间分页
+            'name',
+            {'fields': ['-created_at', '-id'], 'name': 'created_at_id'},
+            {'fields': ['tokens_revoked_at'], 'sparse': True}
+        ]
     }
 
     @property
@@ -61,41 +77,127 @@ class User(UserMixin, BaseDocument):
         return self.role == UserRole.ADMIN
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # 线程池已满时抛出 HasherBusy
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def upgrade_password_hash(self, password):
+        """哈希参数变更后，用本次登录的明文按新参数重新生成哈希"""
+        if not password_hasher.needs_rehash(self.password_hash):
+            return False
+        self.password_hash = password_hasher.hash(password)
+        User.objects(id=self.id).update_one(set__password_hash=self.password_hash)
+        return True
 
     def get_id(self):
         return str(self.id)
     
     @property
     def avatar_url(self):
-        if self.image:
-            return self.image
+        return User.build_avatar_url(self.email, self.image)
+
+    @staticmethod
+    def build_avatar_url(email, image=None):
+        """根据头像和邮箱生成头像地址，也用于未构建文档的原始数据"""
+        if image:
+            return image
         
         # 使用邮箱生成唯一的种子
-        email_hash = hashlib.md5(self.email.lower().encode()).hexdigest()
+        email_hash = hashlib.md5(email.lower().encode()).hexdigest()
         # 使用 DiceBear 的 avataaars 风格
         return f"https://api.dicebear.com/7.x/avataaars/svg?seed={email_hash}"
 
     def generate_token(self):
-        """生成 JWT token"""
+        """生成 JWT token，角色、名称和 token 版本写入声明，无状态模式下据此鉴权"""
+        expires = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', timedelta(days=1))
         payload = {
             'user_id': str(self.id),
-            'exp': datetime.utcnow() + timedelta(days=1)
+            'role': UserRole(self.role).value,
+            'name': self.name,
+            'email': self.email,
+            'ver': self.token_version or 0,
+            'exp': datetime.utcnow() + expires
         }
+        if self.image:
+            payload['image'] = self.image
         return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
 
+    @staticmethod
+    def decode_token(token):
+        """校验签名和有效期，返回 token 声明，无效时返回 None"""
+        try:
+            return jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        except jwt.PyJWTError:
+            return None
+
     @staticmethod
     def verify_token(token):
-        """验证 JWT token"""
+        """验证 JWT token，返回只读的用户快照"""
         try:
-            payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-            return User.objects(id=payload['user_id']).first()
+            payload = User.decode_token(token)
+            return User.get_snapshot(payload['user_id']) if payload else None
         except:
             return None
 
+    @staticmethod
+    def get_snapshot(user_id):
+        """按 id 获取用户快照，命中进程内缓存时不查询数据库"""
+        snapshot = user_cache.get(user_id)
+        if snapshot is None:
+            doc = (
+                User.objects(id=user_id)
+                .only('email', 'name', 'image', 'role', 'created_at')
+                .as_pymongo()
+                .first()
+            )
+            if doc is None:
+                return None
+            snapshot = UserSnapshot(
+                id=doc['_id'],
+                email=doc['email'],
+                name=doc.get('name'),
+                image=doc.get('image'),
+                role=UserRole(doc.get('role', UserRole.USER)),
+                created_at=doc.get('created_at'),
+            )
+            user_cache.set(user_id, snapshot)
+        return snapshot
+
+    @staticmethod
+    def snapshot_from_claims(payload):
+        """直接由 token 声明构造用户快照，不查询数据库"""
+        return UserSnapshot(
+            id=payload['user_id'],
+            email=payload['email'],
+            name=payload.get('name'),
+            image=payload.get('image'),
+            role=UserRole(payload['role']),
+            created_at=None,
+        )
+
+
+class UserSnapshot(UserMixin, namedtuple('UserSnapshot', 'id email name image role created_at')):
+    """认证用的只读用户快照
+
+    需要修改用户时先用 User.objects(id=...) 取出文档，保存后调用
+    user_cache.pop(user_id) 失效本 worker 的缓存，其他 worker 最多在
+    USER_CACHE_TTL 秒后生效。
+    """
+    __slots__ = ()
+
+    @property
+    def is_admin(self):
+        return self.role == UserRole.ADMIN
+
+    @property
+    def avatar_url(self):
+        return User.build_avatar_url(self.email, self.image)
+
+    def get_id(self):
+        return str(self.id)
+
 class Language(BaseDocument):
     name = db.StringField(required=True)
     name_zh = db.StringField(required=True)
@@ -121,33 +223,44 @@ class Prompt(BaseDocument):
         'collection': 'prompts',
         'indexes': [
             'language',
-            'author',
+            {'fields': ['author', '-created_at', '-id'], 'name': 'author_created_id'},
             'status',
             'type',
-            '-created_at',
+            # 管理后台不按状态筛选时的默认列表，末尾的 id 用于键集分页
+            {'fields': ['-created_at', '-id'], 'name': 'created_at_id'},
             '-likes_count',
             '-favorites_count',
-            # 复合索引
+            # 搜索索引按 updated_at 增量同步其他 worker 的修改
+            'updated_at',
+            # 复合索引（末尾的 id 与列表排序一致，用于键集分页）
+            {
+                'fields': ['status', '-created_at', '-id'],
+                'name': 'status_created_at_id'
+            },
             {
-                'fields': ['status', '-created_at'],
-                'name': 'status_created_at'
+                'fields': ['status', 'language', '-created_at', '-id'],
+                'name': 'status_language_created_id'
             },
             {
-                'fields': ['status', 'language', '-created_at'],
-                'name': 'status_language_created'
+                'fields': ['status', '-likes_count', '-created_at', '-id'],
+                'name': 'status_likes_created_id'
             },
+            # 全文索引，与 mongo-init.js 中创建的索引保持一致
             {
-                'fields': ['status', '-likes_count'],
-                'name': 'status_likes'
+                'fields': ['$title', '$content'],
+                'name': 'title_text_content_text'
             }
         ]
     }
 
     def update_counts(self):
-        """更新点赞和收藏计数"""
-        self.likes_count = Like.objects(prompt=self).count()
-        self.favorites_count = Favorite.objects(prompt=self).count()
-        self.save()
+        """按点赞和收藏关系重新统计计数，只写这两个字段"""
+        self.likes_count = Like.objects(prompt=self.id).count()
+        self.favorites_count = Favorite.objects(prompt=self.id).count()
+        Prompt.objects(id=self.id).update_one(
+            set__likes_count=self.likes_count,
+            set__favorites_count=self.favorites_count
+        )
 
 class Like(db.Document):
     id = db.StringField(primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -160,7 +273,8 @@ class Like(db.Document):
         'indexes': [
             {'fields': ['user', 'prompt'], 'unique': True},
             'prompt',
-            'user'
+            # 用户的点赞/收藏列表按时间倒序键集分页
+            {'fields': ['user', '-created_at', '-id'], 'name': 'user_created_id'}
         ]
     }
 
@@ -175,7 +289,8 @@ class Favorite(db.Document):
         'indexes': [
             {'fields': ['user', 'prompt'], 'unique': True},
             'prompt',
-            'user'
+            # 用户的点赞/收藏列表按时间倒序键集分页
+            {'fields': ['user', '-created_at', '-id'], 'name': 'user_created_id'}
         ]
     }
 
@@ -192,4 +307,26 @@ class Review(BaseDocument):
             'reviewer',
             'created_at'
         ]
-    } 
\ No newline at end of file
+    }
+
+class DeleteJob(BaseDocument):
+    """已删除提示词的关联数据清理任务
+
+    提示词在请求中直接删除，点赞、收藏和审核记录由后台线程分批清理；
+    任务记录同时充当墓碑，进程中断后其他 worker 会接手未完成的任务。
+    """
+    prompt_ids = db.ListField(db.StringField(), required=True)
+    requested_by = db.ReferenceField(User)
+    status = db.EnumField(DeleteJobStatus, default=DeleteJobStatus.PENDING)
+    # 各集合已删除的记录数，如 {'likes': 120, 'favorites': 8, 'reviews': 1}
+    deleted = db.DictField()
+    finished_at = db.DateTimeField()
+
+    meta = {
+        'collection': 'delete_jobs',
+        'indexes': [
+            {'fields': ['status', 'updated_at'], 'name': 'status_updated_at'},
+            # 搜索索引按创建时间同步删除
+            'created_at'
+        ]
+    }
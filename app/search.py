@@ -0,0 +1,551 @@
+import bisect
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from .models import Prompt, Language, PromptStatus, DeleteJob, get_utc_now
+
+logger = logging.getLogger(__name__)
+
+# 连续的中日韩字符，以及其他文字的字母/数字组成的词（不含下划线）
+CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+TOKEN_RE = re.compile(r"[%s]+|(?:(?![%s])[^\W_])+" % (CJK_RANGES, CJK_RANGES))
+CJK_RE = re.compile(r"[%s]" % CJK_RANGES)
+
+# 标题中的词按该倍数计入词频
+TITLE_BOOST = 3
+
+
+def normalize(text):
+    """NFKC 规范化并转为小写，全角字符、兼容字符和组合重音统一为同一形式"""
+    return unicodedata.normalize("NFKC", text or "").casefold()
+
+
+def tokenize(text):
+    """分词：中日韩文字切成相邻字符的二元组，其他文字按单词切分"""
+    tokens = []
+    for match in TOKEN_RE.finditer(normalize(text)):
+        token = match.group()
+        if CJK_RE.match(token):
+            if len(token) == 1:
+                tokens.append(token)
+            else:
+                tokens.extend(token[i : i + 2] for i in range(len(token) - 1))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+class SearchIndex:
+    """已发布提示词的内存倒排索引，使用 BM25 打分
+
+    倒排表为 array 存储的 (文档槽位, 词频) 两列，内存占用可预期。
+    删除和更新只把旧槽位标记为失效，失效槽位超过一定比例时压缩倒排表。
+    每个 worker 首次搜索时在后台线程中从投影游标构建索引，之后本进程内的写操作
+    直接增量更新。构建完成后启动同步线程，每隔 sync_interval 秒按 updated_at
+    拉取其他 worker 的修改、按清理任务 (DeleteJob) 移除已删除的提示词；
+    每隔 reconcile_interval 秒再与已发布提示词的 id 全集比对一次，去掉不经
+    updated_at 的批量修改留下的失效条目。查询都在锁外进行，搜索请求不等待同步。
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(
+        self, enabled=True, sync_interval=60, compact_ratio=0.2, reconcile_interval=600
+    ):
+        self.enabled = enabled
+        self.sync_interval = sync_interval
+        self.compact_ratio = compact_ratio
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.RLock()
+        self._building = False
+        self._thread = None
+        self._pid = None
+        self._reset()
+
+    def init_app(self, app):
+        self.enabled = app.config.get("SEARCH_INDEX_ENABLED", self.enabled)
+        self.sync_interval = app.config.get(
+            "SEARCH_INDEX_SYNC_INTERVAL", self.sync_interval
+        )
+        self.reconcile_interval = app.config.get(
+            "SEARCH_INDEX_RECONCILE_INTERVAL", self.reconcile_interval
+        )
+        with self._lock:
+            self._reset()
+
+    _STATE = (
+        "_postings",
+        "_term_ids",
+        "_df",
+        "_slot_terms",
+        "_slot_ids",
+        "_slot_lengths",
+        "_slot_languages",
+        "_slot_types",
+        "_alive",
+        "_slots",
+        "_total_length",
+        "_watermark",
+        "_deleted_watermark",
+        "_reconciled_at",
+    )
+
+    def _reset(self):
+        self.ready = False
+        self._postings = {}  # term -> (array 槽位, array 词频)
+        self._term_ids = {}  # term -> 词编号
+        self._df = array("I")  # 词编号 -> 有效槽位中的文档频率
+        self._slot_terms = []  # 槽位 -> array 词编号，删除时据此递减文档频率
+        self._slot_ids = []  # 槽位 -> 提示词 id
+        self._slot_lengths = array("I")
+        self._slot_languages = []
+        self._slot_types = []
+        self._alive = bytearray()
+        self._slots = {}  # 提示词 id -> 当前槽位
+        self._total_length = 0
+        self._watermark = None
+        self._deleted_watermark = None
+        self._reconciled_at = 0
+
+    @property
+    def size(self):
+        return len(self._slots)
+
+    def ensure_ready(self):
+        """索引可用时返回 True；否则在后台开始构建并返回 False"""
+        if not self.enabled:
+            return False
+        if self.ready:
+            self._ensure_worker()
+            return True
+        with self._lock:
+            if not self._building:
+                self._building = True
+                threading.Thread(
+                    target=self.build, name="search-index-build", daemon=True
+                ).start()
+        return False
+
+    def build(self):
+        """从数据库全量构建索引
+
+        在新对象上构建，完成后一次性替换，构建期间不阻塞搜索。
+        """
+        try:
+            started = time.monotonic()
+            fresh = SearchIndex(
+                self.enabled, self.sync_interval, self.compact_ratio, self.reconcile_interval
+            )
+            # 构建开始后的修改和删除都会在之后的同步中补上；
+            # 与 MongoDB 存储的时间一致，使用不带时区、精确到毫秒的 UTC 时间
+            now = get_utc_now()
+            built_at = now.replace(
+                microsecond=now.microsecond // 1000 * 1000, tzinfo=None
+            )
+            fresh._load(Prompt.objects(status=PromptStatus.PUBLISHED))
+            fresh._watermark = fresh._watermark or built_at
+            fresh._deleted_watermark = built_at
+            fresh._reconciled_at = time.monotonic()
+            with self._lock:
+                for name in self._STATE:
+                    setattr(self, name, getattr(fresh, name))
+                self.ready = True
+            logger.info(
+                "Search index built: %d prompts in %.2fs",
+                self.size,
+                time.monotonic() - started,
+            )
+        except Exception:
+            logger.exception("Failed to build search index")
+        finally:
+            self._building = False
+
+    def sync(self):
+        """应用其他 worker 的修改和删除，由同步线程定期调用
+
+        拉取 updated_at 晚于上次同步的提示词，移除之后创建的清理任务中的提示词，
+        到期时再与已发布提示词的 id 全集比对。
+        """
+        if self._watermark is None:
+            return
+        try:
+            # 同一毫秒内可能有多次修改，用 >= 重复加载边界上的文档也没有影响
+            docs = list(self._fetch(Prompt.objects(updated_at__gte=self._watermark)))
+            jobs = list(
+                DeleteJob.objects(created_at__gte=self._deleted_watermark)
+                .only("prompt_ids", "created_at")
+                .as_pymongo()
+            )
+            with self._lock:
+                self._apply(docs)
+                for job in jobs:
+                    for prompt_id in job.get("prompt_ids", ()):
+                        self._remove(prompt_id)
+                    if job["created_at"] > self._deleted_watermark:
+                        self._deleted_watermark = job["created_at"]
+                self._maybe_compact()
+            if time.monotonic() - self._reconciled_at > self.reconcile_interval:
+                self.reconcile()
+        except Exception:
+            logger.exception("Failed to sync search index")
+
+    def reconcile(self):
+        """去掉数据库中已不存在或已下线的提示词，返回去掉的条目数"""
+        self._reconciled_at = time.monotonic()
+        with self._lock:
+            known = list(self._slots)
+        live = set(Prompt.objects(status=PromptStatus.PUBLISHED).scalar("id"))
+        # 查询期间本进程重新发布的提示词若被误删，下次按 updated_at 同步时会加回
+        ghosts = [prompt_id for prompt_id in known if prompt_id not in live]
+        with self._lock:
+            for prompt_id in ghosts:
+                self._remove(prompt_id)
+            self._maybe_compact()
+        return len(ghosts)
+
+    def _ensure_worker(self):
+        # gunicorn fork 出的 worker 不会继承线程，按进程启动
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="search-index-sync", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.sync_interval)
+            self.sync()
+
+    @staticmethod
+    def _fetch(queryset):
+        return (
+            queryset.only("title", "content", "language", "type", "status", "updated_at")
+            .as_pymongo()
+            .batch_size(1000)
+        )
+
+    def _load(self, queryset):
+        self._apply(self._fetch(queryset))
+        self._maybe_compact()
+
+    def _apply(self, docs):
+        for doc in docs:
+            self._remove(doc["_id"])
+            if doc.get("status") == PromptStatus.PUBLISHED.value:
+                self._add(doc)
+            updated_at = doc.get("updated_at")
+            if updated_at and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+
+    def update(self, prompt):
+        """提示词新建、修改或状态变化后调用"""
+        if not self.ready:
+            return
+        with self._lock:
+            self._remove(str(prompt.id))
+            if prompt.status == PromptStatus.PUBLISHED:
+                self._add(
+                    {
+                        "_id": str(prompt.id),
+                        "title": prompt.title,
+                        "content": prompt.content,
+                        "language": prompt.language.id if prompt.language else None,
+                        "type": prompt.type.value if prompt.type else None,
+                    }
+                )
+            self._maybe_compact()
+
+    def remove(self, prompt_id):
+        """提示词删除后调用"""
+        if not self.ready:
+            return
+        with self._lock:
+            self._remove(str(prompt_id))
+            self._maybe_compact()
+
+    def _add(self, doc):
+        terms = Counter(tokenize(doc.get("content")))
+        for term in tokenize(doc.get("title")):
+            terms[term] += TITLE_BOOST
+
+        slot = len(self._slot_ids)
+        length = sum(terms.values())
+        term_ids = array("I")
+        self._slot_ids.append(doc["_id"])
+        self._slot_lengths.append(length)
+        self._slot_languages.append(doc.get("language"))
+        self._slot_types.append(doc.get("type"))
+        self._alive.append(1)
+        self._slots[doc["_id"]] = slot
+        self._total_length += length
+
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("I"))
+            postings[0].append(slot)
+            postings[1].append(tf)
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                term_id = self._term_ids[term] = len(self._df)
+                self._df.append(0)
+            self._df[term_id] += 1
+            term_ids.append(term_id)
+        self._slot_terms.append(term_ids)
+
+    def _remove(self, prompt_id):
+        slot = self._slots.pop(prompt_id, None)
+        if slot is not None:
+            self._alive[slot] = 0
+            self._total_length -= self._slot_lengths[slot]
+            for term_id in self._slot_terms[slot]:
+                self._df[term_id] -= 1
+            self._slot_terms[slot] = None
+
+    def _maybe_compact(self):
+        dead = len(self._slot_ids) - len(self._slots)
+        if dead and dead > len(self._slot_ids) * self.compact_ratio:
+            self._compact()
+
+    def _compact(self):
+        """去掉失效槽位并重新编号，只改写倒排表，不需要原文"""
+        remap = array("i", [-1]) * len(self._slot_ids)
+        slot_ids = []
+        slot_lengths = array("I")
+        slot_languages = []
+        slot_types = []
+        slot_terms = []
+        for old, alive in enumerate(self._alive):
+            if alive:
+                remap[old] = len(slot_ids)
+                slot_terms.append(self._slot_terms[old])
+                slot_ids.append(self._slot_ids[old])
+                slot_lengths.append(self._slot_lengths[old])
+                slot_languages.append(self._slot_languages[old])
+                slot_types.append(self._slot_types[old])
+
+        postings = {}
+        for term, (slots, tfs) in self._postings.items():
+            new_slots, new_tfs = array("I"), array("I")
+            for slot, tf in zip(slots, tfs):
+                if remap[slot] >= 0:
+                    new_slots.append(remap[slot])
+                    new_tfs.append(tf)
+            if new_slots:
+                postings[term] = (new_slots, new_tfs)
+
+        # 文档频率只计有效槽位，压缩前后不变；不再出现的词编号保留到下次全量构建
+        self._postings = postings
+        self._slot_terms = slot_terms
+        self._slot_ids = slot_ids
+        self._slot_lengths = slot_lengths
+        self._slot_languages = slot_languages
+        self._slot_types = slot_types
+        self._alive = bytearray([1]) * len(slot_ids)
+        self._slots = {pid: slot for slot, pid in enumerate(slot_ids)}
+
+    def search(self, query, limit, language=None, prompt_type=None, after=None):
+        """返回按 (score, id) 降序排列的前 limit 条 (score, prompt_id)
+
+        after 为上一页最后一条的 (score, prompt_id)，用于游标分页。
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._slots)
+            if not terms or not n_docs:
+                return []
+            avg_length = self._total_length / n_docs
+            alive = self._alive
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                # 文档频率只计有效槽位，失效槽位不影响 IDF
+                df = self._df[self._term_ids[term]]
+                if not df:
+                    continue
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for slot, tf in zip(*postings):
+                    if not alive[slot]:
+                        continue
+                    if language is not None and self._slot_languages[slot] != language:
+                        continue
+                    if prompt_type is not None and self._slot_types[slot] != prompt_type:
+                        continue
+                    norm = self.k1 * (
+                        1 - self.b + self.b * self._slot_lengths[slot] / avg_length
+                    )
+                    scores[slot] = scores.get(slot, 0.0) + idf * tf * (self.k1 + 1) / (
+                        tf + norm
+                    )
+
+            hits = ((score, self._slot_ids[slot]) for slot, score in scores.items())
+            if after is not None:
+                hits = (hit for hit in hits if hit < tuple(after))
+            return heapq.nlargest(limit, hits)
+
+
+class SuggestIndex:
+    """已发布提示词标题和语言名称的前缀补全索引
+
+    条目按规范化后的文本排序存放在列表中，用 bisect 定位前缀区间；
+    每个条目带有热度（提示词为 likes_count，语言为 popularity），返回热度最高的 k 条。
+    前缀匹配条目较多时缓存其 top-k 结果，索引变化时清空。
+    本进程内的写操作直接增量更新，热度变化和其他 worker 的修改靠定期全量重建。
+    """
+
+    # 前缀区间超过该条目数时缓存 top-k 结果
+    memo_threshold = 1000
+
+    def __init__(self, enabled=True, refresh_interval=300, max_limit=20):
+        self.enabled = enabled
+        self.refresh_interval = refresh_interval
+        self.max_limit = max_limit
+        self._lock = threading.RLock()
+        self._building = False
+        self.ready = False
+        self._built_at = 0
+        self._items = []  # (规范化文本, id, 类型, 原文, slug, 热度)
+        self._keys = {}  # id -> 规范化文本
+        self._memo = {}
+
+    def init_app(self, app):
+        self.enabled = app.config.get("SUGGEST_INDEX_ENABLED", self.enabled)
+        self.refresh_interval = app.config.get(
+            "SUGGEST_INDEX_REFRESH_INTERVAL", self.refresh_interval
+        )
+        with self._lock:
+            self.ready = False
+            self._items, self._keys, self._memo = [], {}, {}
+
+    def ensure_ready(self):
+        """索引可用时返回 True；需要（重新）构建时在后台开始构建"""
+        if not self.enabled:
+            return False
+        stale = time.monotonic() - self._built_at > self.refresh_interval
+        if not self.ready or stale:
+            with self._lock:
+                if not self._building:
+                    self._building = True
+                    threading.Thread(
+                        target=self.build, name="suggest-index-build", daemon=True
+                    ).start()
+        return self.ready
+
+    def build(self):
+        try:
+            items = []
+            prompts = (
+                Prompt.objects(status=PromptStatus.PUBLISHED)
+                .only("title", "likes_count")
+                .as_pymongo()
+                .batch_size(1000)
+            )
+            for doc in prompts:
+                if doc.get("title"):
+                    items.append(
+                        self._entry(
+                            "prompt", doc["_id"], doc["title"], None, doc.get("likes_count", 0)
+                        )
+                    )
+            for doc in Language.objects.only("name", "slug", "popularity").as_pymongo():
+                if doc.get("name"):
+                    items.append(
+                        self._entry(
+                            "language",
+                            doc["_id"],
+                            doc["name"],
+                            doc.get("slug"),
+                            doc.get("popularity", 0),
+                        )
+                    )
+            items.sort()
+            with self._lock:
+                self._items = items
+                self._keys = {item[1]: item[0] for item in items}
+                self._memo = {}
+                self._built_at = time.monotonic()
+                self.ready = True
+        except Exception:
+            logger.exception("Failed to build suggest index")
+        finally:
+            self._building = False
+
+    @staticmethod
+    def _entry(kind, item_id, text, slug, popularity):
+        return (normalize(text), str(item_id), kind, text, slug, popularity or 0)
+
+    def update(self, prompt):
+        """提示词新建、修改或状态变化后调用"""
+        if not self.ready:
+            return
+        with self._lock:
+            self._remove(str(prompt.id))
+            if prompt.status == PromptStatus.PUBLISHED and prompt.title:
+                entry = self._entry(
+                    "prompt", prompt.id, prompt.title, None, prompt.likes_count
+                )
+                bisect.insort(self._items, entry)
+                self._keys[entry[1]] = entry[0]
+            self._memo = {}
+
+    def remove(self, prompt_id):
+        """提示词删除后调用"""
+        if not self.ready:
+            return
+        with self._lock:
+            self._remove(str(prompt_id))
+            self._memo = {}
+
+    def _remove(self, item_id):
+        key = self._keys.pop(item_id, None)
+        if key is None:
+            return
+        i = bisect.bisect_left(self._items, (key, item_id))
+        if i < len(self._items) and self._items[i][:2] == (key, item_id):
+            del self._items[i]
+
+    def suggest(self, prefix, limit=10):
+        """返回以 prefix 开头、热度最高的 limit 个条目"""
+        prefix = normalize(prefix).strip()
+        limit = min(max(limit, 1), self.max_limit)
+        if not prefix:
+            return []
+        with self._lock:
+            top = self._memo.get(prefix)
+            if top is None:
+                start = bisect.bisect_left(self._items, (prefix,))
+                end = bisect.bisect_left(self._items, (prefix + "\uffff",), start)
+                top = heapq.nlargest(
+                    self.max_limit, self._items[start:end], key=lambda item: item[5]
+                )
+                if end - start > self.memo_threshold:
+                    self._memo[prefix] = top
+        return [
+            {
+                "type": kind,
+                "id": item_id,
+                "text": text,
+                "slug": slug,
+                "popularity": popularity,
+            }
+            for _, item_id, kind, text, slug, popularity in top[:limit]
+        ]
+
+
+search_index = SearchIndex()
+suggest_index = SuggestIndex()
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import threading
+import time
+from .models import Prompt, Language, PromptStatus
+
+# likes_count 达到该值的提示词计为热门
+POPULAR_LIKES_THRESHOLD = 10
+
+
+class PromptStats:
+    """已发布提示词按语言统计的物化快照
+
+    快照由一次 $group 聚合生成，提示词状态或语言变化时标记为过期，
+    下次读取时重新计算；每个 worker 各自持有一份，最长保留 ttl 秒。
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._snapshot = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get("PROMPT_STATS_TTL", self.ttl)
+        self.invalidate()
+
+    def invalidate(self):
+        self._expires_at = 0
+
+    def get(self):
+        if self._snapshot is None or self._expires_at < time.monotonic():
+            with self._lock:
+                if self._snapshot is None or self._expires_at < time.monotonic():
+                    self._snapshot = self._compute()
+                    self._expires_at = time.monotonic() + self.ttl
+        return self._snapshot
+
+    def _compute(self):
+        pipeline = [
+            {
+                "$group": {
+                    "_id": "$language",
+                    "count": {"$sum": 1},
+                    "popular": {
+                        "$sum": {
+                            "$cond": [
+                                {"$gte": ["$likes_count", POPULAR_LIKES_THRESHOLD]},
+                                1,
+                                0,
+                            ]
+                        }
+                    },
+                }
+            }
+        ]
+        counts = {}
+        total_count = 0
+        popular_count = 0
+        for row in Prompt.objects(status=PromptStatus.PUBLISHED).aggregate(pipeline):
+            counts[row["_id"]] = row["count"]
+            total_count += row["count"]
+            popular_count += row["popular"]
+
+        languages = [
+            {
+                "id": str(lang["_id"]),
+                "name": lang.get("name"),
+                "slug": lang.get("slug"),
+                "popularity": lang.get("popularity", 0),
+            }
+            for lang in Language.objects.order_by("-popularity")
+            .only("name", "slug", "popularity")
+            .as_pymongo()
+        ]
+
+        snapshot = {
+            "counts": counts,
+            "total_count": total_count,
+            "popular_count": popular_count,
+            "languages": languages,
+        }
+        # 由内容生成的版本戳，数据相同时各 worker 得到相同的 ETag。
+        # counts 的键可能是 None（未设置语言的提示词），与其他键混合时无法
+        # sort_keys，先转为按字符串排序的列表
+        stable = [
+            sorted((str(key), count) for key, count in counts.items()),
+            total_count,
+            popular_count,
+            languages,
+        ]
+        snapshot["version"] = hashlib.md5(json.dumps(stable).encode()).hexdigest()
+        return snapshot
+
+
+prompt_stats = PromptStats()
@@ -0,0 +1,62 @@
+import threading
+import time
+from datetime import timedelta
+from .models import User, get_utc_now
+
+
+class TokenRevocations:
+    """无状态认证模式下的 token 版本表
+
+    只记录 token 有效期内吊销过 token 的用户及其当前版本，token 中的版本
+    低于表中版本即视为失效。每个 worker 各自持有一份，每隔 refresh_interval
+    秒从 Mongo 整体刷新一次；本 worker 内的吊销立即生效，其他 worker 最多
+    延迟 refresh_interval 秒。
+    """
+
+    def __init__(self, refresh_interval=30, max_age=timedelta(days=1)):
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._versions = {}
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.refresh_interval = app.config.get(
+            "TOKEN_REVOCATION_REFRESH_INTERVAL", self.refresh_interval
+        )
+        self.max_age = app.config.get("JWT_ACCESS_TOKEN_EXPIRES", self.max_age)
+        self._versions = {}
+        self._expires_at = 0
+
+    def is_revoked(self, user_id, version):
+        if self._expires_at < time.monotonic():
+            with self._lock:
+                if self._expires_at < time.monotonic():
+                    self._versions = self._load()
+                    self._expires_at = time.monotonic() + self.refresh_interval
+        return self._versions.get(user_id, 0) > version
+
+    def revoke(self, user_id):
+        """递增用户的 token 版本，使其已签发的 token 全部失效"""
+        user = (
+            User.objects(id=user_id)
+            .only("token_version")
+            .modify(new=True, inc__token_version=1, set__tokens_revoked_at=get_utc_now())
+        )
+        if user is not None:
+            with self._lock:
+                self._versions[user_id] = user.token_version
+        return user
+
+    def _load(self):
+        # 早于 token 有效期的吊销已无意义，此前签发的 token 都已过期
+        since = get_utc_now() - self.max_age
+        return {
+            doc["_id"]: doc.get("token_version", 0)
+            for doc in User.objects(tokens_revoked_at__gte=since)
+            .only("token_version")
+            .as_pymongo()
+        }
+
+
+token_revocations = TokenRevocations()
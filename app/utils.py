@@ -1,3 +1,8 @@
+import base64
+import json
+from datetime import datetime
+
+
 class Pagination:
     def __init__(self, page, per_page, total, items):
         self.page = page
@@ -12,4 +17,51 @@ class Pagination:
     
     @property
     def has_next(self):
-        return self.page < self.pages 
\ No newline at end of file
+        return self.page < self.pages
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def clamp_per_page(per_page, max_per_page):
+    """把 per_page 限制在 [1, max_per_page] 范围内"""
+    if not per_page or per_page < 1:
+        return 1
+    return min(per_page, max_per_page)
+
+
+def encode_cursor(sort, values):
+    """把排序键的最后一组取值编码为不透明的游标字符串
+
+    values 按排序字段顺序给出，datetime 会被序列化为 ISO 格式。
+    """
+    payload = {
+        's': sort,
+        'v': [v.isoformat() if isinstance(v, datetime) else v for v in values],
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort, fields):
+    """解码游标，返回与 fields 对应的取值列表
+
+    fields 是排序字段名列表，名为 created_at 的字段会被还原为 datetime。
+    游标格式错误或排序方式不匹配时抛出 InvalidCursor。
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload['s'] != sort or len(payload['v']) != len(fields):
+            raise InvalidCursor(cursor)
+        values = []
+        for field, value in zip(fields, payload['v']):
+            if field == 'created_at':
+                value = datetime.fromisoformat(value)
+            values.append(value)
+        return values
+    except InvalidCursor:
+        raise
+    except Exception:
+        raise InvalidCursor(cursor)
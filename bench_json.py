@@ -0,0 +1,66 @@
+"""对比标准库与 orjson 编码一页 100 条提示词的耗时
+
+用法: python bench_json.py [条数] [重复次数]
+"""
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from flask import Flask, json
+from app.encoders import JSONEncoder, ORJSONEncoder, orjson
+from app.models import PromptStatus
+
+
+def build_page(size):
+    created_at = datetime(2024, 1, 1)
+    content = "Use functional components and hooks. 使用函数组件和 hooks。\n" * 40
+    return {
+        "prompts": [
+            {
+                "id": str(uuid.uuid4()),
+                "title": f"Prompt {i} best practices",
+                "content": content,
+                "status": PromptStatus.PUBLISHED,
+                "author": {
+                    "id": str(uuid.uuid4()),
+                    "name": "Admin",
+                    "avatar_url": "https://api.dicebear.com/7.x/avataaars/svg?seed=x",
+                },
+                "language": {"id": str(uuid.uuid4()), "name": "Python", "slug": "python"},
+                "likes_count": i,
+                "favorites_count": i // 2,
+                "created_at": created_at + timedelta(minutes=i),
+                "is_liked": False,
+                "is_favorited": False,
+            }
+            for i in range(size)
+        ],
+        "pagination": {"page": 1, "per_page": size, "total": 1000, "has_next": True},
+    }
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    number = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    page = build_page(size)
+    app = Flask(__name__)
+
+    encoders = [("stdlib", JSONEncoder)]
+    if orjson is not None:
+        encoders.append(("orjson", ORJSONEncoder))
+    else:
+        print("orjson 未安装，只测试标准库编码器")
+
+    with app.app_context():
+        for name, encoder in encoders:
+            app.json_encoder = encoder
+            body = json.dumps(page)
+            seconds = timeit.timeit(lambda: json.dumps(page), number=number)
+            print(
+                f"{name:>6}: {seconds / number * 1000:.3f} ms/页 "
+                f"({size} 条, {len(body.encode()) / 1024:.1f} KB)"
+            )
+
+
+if __name__ == "__main__":
+    main()
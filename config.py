@@ -16,5 +16,62 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY") or "dev"
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1)
+    # 无状态认证：直接按 token 中的角色声明鉴权，不查用户、不写 session
+    JWT_STATELESS = os.environ.get("JWT_STATELESS") == "1"
+    TOKEN_REVOCATION_REFRESH_INTERVAL = 30  # 秒，吊销在其他 worker 中的最长延迟
+    # 密码哈希参数，修改后旧哈希在用户下次登录成功时自动升级
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:260000")
+    PASSWORD_HASH_SALT_LENGTH = 16
+    # 每个 worker 进程的哈希线程数与排队上限，超出时登录/注册返回 503。
+    # 两者之和需小于 gunicorn 的 --threads（Dockerfile 中为 8），留出线程处理其他请求
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_MAX_PENDING = 4
+    PASSWORD_HASH_TIMEOUT = 10  # 秒
     LANGUAGES = ["en", "zh"]
     DEFAULT_LANGUAGE = "en"
+    # 日志：默认级别、按 logger 名称单独设置的级别、DEBUG 日志每秒采样上限
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+    LOG_LEVELS = {}  # 例如 {"app.api": "DEBUG"}
+    LOG_DEBUG_SAMPLE_RATE = 10
+    JSON_BACKEND = "orjson"  # "orjson" 或 "stdlib"，orjson 未安装时自动使用标准库
+    MAX_PER_PAGE = 50  # 列表接口每页条数上限
+    BULK_STATUS_MAX_IDS = 500  # 批量审核接口单次最多处理的提示词数
+    BULK_DELETE_MAX_IDS = 500  # 批量删除接口单次最多删除的提示词数
+    # 删除提示词后在后台分批清理点赞、收藏和审核记录
+    CASCADE_DELETE_BATCH_SIZE = 1000
+    CASCADE_DELETE_POLL_INTERVAL = 30  # 秒，检查其他 worker 遗留任务的间隔
+    CASCADE_DELETE_STALE_AFTER = 300  # 秒，RUNNING 任务超过该时间无进度则重新认领
+    # 列表接口直接序列化原始 BSON 字典，关闭后退回 MongoEngine 文档路径
+    RAW_READ_PATH = os.environ.get("RAW_READ_PATH", "1") == "1"
+    # 匿名提示词列表响应缓存
+    PROMPT_LIST_CACHE_ENABLED = True
+    PROMPT_LIST_CACHE_SIZE = 512
+    PROMPT_LIST_CACHE_TTL = 60  # 秒
+    # 认证用户快照缓存，角色变更在其他 worker 中最多延迟 TTL 秒生效
+    USER_CACHE_ENABLED = True
+    USER_CACHE_SIZE = 4096
+    USER_CACHE_TTL = 30  # 秒
+    # 详情、语言和统计接口的 HTTP 缓存：max-age 内直接使用，之后的
+    # stale-while-revalidate 秒内可先返回旧内容再后台用 ETag 验证
+    HTTP_CACHE_MAX_AGE = 10
+    HTTP_CACHE_STALE_WHILE_REVALIDATE = 60
+    # 响应压缩：按 Accept-Encoding 选择 br / gzip，小于阈值的响应不压缩，
+    # 超过流式阈值的响应边压缩边发送
+    COMPRESS_ENABLED = True
+    COMPRESS_MIMETYPES = ["application/json", "text/html", "text/plain"]
+    COMPRESS_MIN_SIZE = 1024  # 字节
+    COMPRESS_STREAM_THRESHOLD = 256 * 1024  # 字节
+    COMPRESS_LEVEL = 6  # gzip 1-9
+    COMPRESS_BR_LEVEL = 4  # brotli 0-11
+    PROMPT_STATS_TTL = 300  # 语言统计快照的最长有效期（秒）
+    # 点赞/收藏计数写后缓冲（热点提示词高并发时开启）
+    COUNTER_WRITE_BEHIND = os.environ.get("COUNTER_WRITE_BEHIND") == "1"
+    COUNTER_FLUSH_INTERVAL = 2  # 秒
+    COUNTER_MAX_PENDING = 10000
+    # 内存 BM25 搜索索引（支持中文），未就绪时退回 MongoDB 全文索引
+    SEARCH_INDEX_ENABLED = True
+    SEARCH_INDEX_SYNC_INTERVAL = 60  # 同步其他 worker 修改的间隔（秒）
+    SEARCH_INDEX_RECONCILE_INTERVAL = 600  # 与已发布提示词 id 全集比对的间隔（秒）
+    # 标题和语言名称的前缀补全索引
+    SUGGEST_INDEX_ENABLED = True
+    SUGGEST_INDEX_REFRESH_INTERVAL = 300  # 全量重建以刷新热度的间隔（秒）
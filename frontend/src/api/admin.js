@@ -28,9 +28,11 @@ export function updatePrompt(promptId, data) {
   return axios.put(`/admin/prompts/${promptId}`, data)
 }
 
-// 获取所有用户
-export const getUsers = () => {
-  return axios.get('/admin/users')
+// 获取用户列表（游标分页，cursor 为上一页返回的 pagination.next_cursor）
+export const getUsers = ({ cursor, per_page = 20 } = {}) => {
+  return axios.get('/admin/users', {
+    params: { cursor, per_page }
+  })
 }
 
 // 更新用户角色
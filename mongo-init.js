@@ -9,7 +9,7 @@ db.createCollection('languages');
 // 创建索引
 db.users.createIndex({ "email": 1 }, { unique: true });
 db.prompts.createIndex({ "title": "text", "content": "text" });
-db.prompts.createIndex({ "created_at": -1 });
+db.prompts.createIndex({ "created_at": -1, "_id": -1 }, { name: "created_at_id" });
 db.prompts.createIndex({ "language": 1 });
 
 // 创建应用数据库用户
@@ -0,0 +1,61 @@
+import pytest
+
+from config import Config
+
+
+def _substr(stage):
+    # mongomock 不支持 $substrCP，测试数据只有 ASCII，替换为 $substr
+    if isinstance(stage, dict):
+        return {
+            ("$substr" if key == "$substrCP" else key): _substr(value)
+            for key, value in stage.items()
+        }
+    if isinstance(stage, list):
+        return [_substr(value) for value in stage]
+    return stage
+
+
+@pytest.fixture
+def app(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    from mongomock.collection import Collection
+
+    aggregate = Collection.aggregate
+    monkeypatch.setattr(
+        Collection,
+        "aggregate",
+        lambda self, pipeline, *args, **kwargs: aggregate(
+            self, _substr(pipeline), *args, **kwargs
+        ),
+    )
+
+    class TestConfig(Config):
+        TESTING = True
+        MONGODB_SETTINGS = {
+            "host": "mongodb://localhost/cwbeauty_test",
+            "db": "cwbeauty_test",
+            "mongo_client_class": mongomock.MongoClient,
+        }
+
+    from app import create_app
+    from app.models import Prompt, Language, User, Like, Favorite, DeleteJob
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        for model in (Prompt, Language, User, Like, Favorite, DeleteJob):
+            model.objects.delete()
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def author(app):
+    from app.models import User
+
+    user = User(email="author@example.com", name="author")
+    user.password_hash = "x"
+    return user.save()
@@ -0,0 +1,29 @@
+"""gunicorn 测试用的应用入口，每个 worker 使用各自的 mongomock 数据库"""
+import os
+
+import mongomock
+
+from app import create_app
+from app.models import Language, User
+from config import Config
+
+
+class GunicornTestConfig(Config):
+    TESTING = True
+    MONGODB_SETTINGS = {
+        "host": "mongodb://localhost/cwbeauty_test",
+        "db": "cwbeauty_test",
+        "mongo_client_class": mongomock.MongoClient,
+    }
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000000")
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 1))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 1))
+
+
+app = create_app(GunicornTestConfig)
+
+with app.app_context():
+    user = User(email="login@example.com", name="login")
+    user.set_password("secret")
+    user.save()
+    Language(name="Python", name_zh="Python", slug="python").save()
@@ -0,0 +1,25 @@
+import pytest
+
+
+@pytest.fixture
+def token(app, author):
+    with app.test_request_context():
+        return author.generate_token()
+
+
+@pytest.mark.parametrize("path", ["/api/v1/auth/me", "/api/v1/user/profile"])
+def test_stateless_requests_do_not_set_session_cookie(app, client, token, path):
+    app.config["JWT_STATELESS"] = True
+    response = client.get(path, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert "Set-Cookie" not in response.headers
+
+
+def test_session_mode_still_sets_cookie(app, client, token):
+    app.config["JWT_STATELESS"] = False
+    response = client.get(
+        "/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    assert "Set-Cookie" in response.headers
+    assert response.get_json()["user"]["name"] == "author"
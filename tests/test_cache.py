@@ -0,0 +1,63 @@
+from app import cache
+from app.cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return ResponseCache(**kwargs), clock
+
+
+def test_get_returns_stored_value(monkeypatch):
+    c, _ = make_cache(monkeypatch)
+    c.set("a", b"1")
+    assert c.get("a") == b"1"
+    assert c.get("b") is None
+    assert (c.hits, c.misses) == (1, 1)
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    c, clock = make_cache(monkeypatch, ttl=10)
+    c.set("a", b"1")
+    clock.now += 9
+    assert c.get("a") == b"1"
+    clock.now += 2
+    assert c.get("a") is None
+    assert c.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    c, _ = make_cache(monkeypatch, maxsize=2)
+    c.set("a", b"1")
+    c.set("b", b"2")
+    # 读取 a 使其成为最近使用，再写入 c 时淘汰 b
+    assert c.get("a") == b"1"
+    c.set("c", b"3")
+    assert c.get("b") is None
+    assert c.get("a") == b"1"
+    assert c.get("c") == b"3"
+
+
+def test_invalidate_with_predicate(monkeypatch):
+    c, _ = make_cache(monkeypatch)
+    c.set(("latest", "python"), b"1")
+    c.set(("latest", "rust"), b"2")
+    c.invalidate(lambda key: key[1] == "python")
+    assert c.get(("latest", "python")) is None
+    assert c.get(("latest", "rust")) == b"2"
+    c.invalidate()
+    assert c.get(("latest", "rust")) is None
+
+
+def test_disabled_cache_stores_nothing(monkeypatch):
+    c, _ = make_cache(monkeypatch, enabled=False)
+    c.set("a", b"1")
+    assert c.get("a") is None
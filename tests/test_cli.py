@@ -0,0 +1,40 @@
+from app.models import Like, Prompt, PromptStatus
+
+
+def make_prompt(author, title, likes_count):
+    return Prompt(
+        title=title,
+        content="x",
+        author=author,
+        status=PromptStatus.PUBLISHED,
+        likes_count=likes_count,
+    ).save()
+
+
+def test_update_counts_fixes_drift(app, author):
+    prompt = make_prompt(author, "drifted", 5)
+    Like(user=author, prompt=prompt).save()
+
+    result = app.test_cli_runner().invoke(args=["update-counts"])
+    assert result.exit_code == 0, result.output
+    assert Prompt.objects.get(id=prompt.id).likes_count == 1
+
+
+def test_update_counts_skips_prompts_changed_after_counting(app, author, monkeypatch):
+    from mongomock.collection import Collection
+
+    changed = make_prompt(author, "changed", 5)
+    stale = make_prompt(author, "stale", 7)
+    bulk_write = Collection.bulk_write
+
+    def concurrent_like(self, operations, *args, **kwargs):
+        # 统计之后、写入之前有一次点赞
+        self.update_one({"_id": changed.id}, {"$inc": {"likes_count": 1}})
+        return bulk_write(self, operations, *args, **kwargs)
+
+    monkeypatch.setattr(Collection, "bulk_write", concurrent_like)
+    result = app.test_cli_runner().invoke(args=["update-counts"])
+    assert result.exit_code == 0, result.output
+    assert f"{changed.id}: 统计后计数已变化，已跳过" in result.output
+    assert Prompt.objects.get(id=changed.id).likes_count == 6
+    assert Prompt.objects.get(id=stale.id).likes_count == 0
@@ -0,0 +1,68 @@
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError, ServerSelectionTimeoutError
+
+from app import counters
+from app.counters import CounterBuffer
+
+
+class FakeCollection:
+    def __init__(self, error=None):
+        self.error = error
+        self.batches = []
+
+    def bulk_write(self, operations, ordered=True):
+        self.batches.append(operations)
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.fixture
+def buffer(monkeypatch):
+    buffer = CounterBuffer()
+    monkeypatch.setattr(buffer, "_ensure_worker", lambda: None)
+    buffer.add("a", "likes_count", 1)
+    buffer.add("b", "likes_count", 2)
+    buffer.add("c", "favorites_count", -1)
+    return buffer
+
+
+def use_collection(monkeypatch, collection):
+    monkeypatch.setattr(counters.Prompt, "_get_collection", lambda: collection)
+
+
+def pending(buffer):
+    return {pid: dict(c) for pid, c in buffer._pending.items()}
+
+
+def test_flush_writes_all_deltas(monkeypatch, buffer):
+    collection = FakeCollection()
+    use_collection(monkeypatch, collection)
+    assert buffer.flush() == 3
+    assert len(collection.batches[0]) == 3
+    assert pending(buffer) == {}
+
+
+def test_bulk_write_error_requeues_only_failed_operations(monkeypatch, buffer):
+    error = BulkWriteError(
+        {"writeErrors": [{"index": 1, "code": 1, "errmsg": "x"}], "nInserted": 0}
+    )
+    use_collection(monkeypatch, FakeCollection(error))
+    assert buffer.flush() == 2
+    assert pending(buffer) == {"b": {"likes_count": 2}}
+
+
+def test_unsent_batch_is_requeued(monkeypatch, buffer):
+    use_collection(monkeypatch, FakeCollection(ServerSelectionTimeoutError("down")))
+    assert buffer.flush() == 0
+    assert pending(buffer) == {
+        "a": {"likes_count": 1},
+        "b": {"likes_count": 2},
+        "c": {"favorites_count": -1},
+    }
+
+
+def test_ambiguous_error_drops_batch(monkeypatch, buffer):
+    # 连接中断时批次可能已经执行，不能再次 $inc
+    use_collection(monkeypatch, FakeCollection(AutoReconnect("reset")))
+    assert buffer.flush() == 0
+    assert pending(buffer) == {}
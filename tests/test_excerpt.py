@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def prompts(app, author):
+    from app.models import Prompt, PromptStatus, Like
+
+    prompts = [
+        Prompt(
+            title=f"prompt {i}",
+            content=f"{i} " + "long content " * 50,
+            author=author,
+            status=PromptStatus.PUBLISHED,
+        ).save()
+        for i in range(3)
+    ]
+    # 点赞时间依次递增，列表按点赞时间倒序
+    start = datetime(2024, 1, 1)
+    for i, prompt in enumerate(prompts):
+        Like(user=author, prompt=prompt, created_at=start + timedelta(minutes=i)).save()
+    return prompts
+
+
+@pytest.fixture
+def pipelines(monkeypatch):
+    from mongomock.collection import Collection
+
+    seen = []
+    aggregate = Collection.aggregate
+
+    def record(self, pipeline, *args, **kwargs):
+        seen.append(pipeline)
+        return aggregate(self, pipeline, *args, **kwargs)
+
+    monkeypatch.setattr(Collection, "aggregate", record)
+    return seen
+
+
+def login(client, app, user):
+    with app.test_request_context():
+        token = user.generate_token()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+
+
+def test_list_excerpt_is_truncated_in_query(app, client, prompts, pipelines):
+    response = client.get("/api/v1/prompts?excerpt=10")
+    assert response.status_code == 200
+    data = response.get_json()["prompts"]
+    assert sorted(p["excerpt"] for p in data) == ["0 long con", "1 long con", "2 long con"]
+    assert all("content" not in p for p in data)
+    (project,) = [s["$project"] for s in pipelines[-1] if "$project" in s]
+    assert "content" not in project and "excerpt" in project
+
+
+def test_excerpt_matches_document_path(app, client, prompts):
+    raw = client.get("/api/v1/prompts?fields=title,excerpt&excerpt=15").get_json()
+    app.config["RAW_READ_PATH"] = False
+    docs = client.get("/api/v1/prompts?fields=title,excerpt&excerpt=15").get_json()
+    assert raw["prompts"] == docs["prompts"]
+
+
+def test_excerpt_param_adds_excerpt_to_fields(app, client, prompts):
+    data = client.get("/api/v1/prompts?fields=title&excerpt=10").get_json()
+    assert sorted(data["prompts"][0]) == ["excerpt", "id", "title"]
+    assert sorted(p["excerpt"] for p in data["prompts"]) == [
+        "0 long con",
+        "1 long con",
+        "2 long con",
+    ]
+
+
+def test_content_and_excerpt_together(app, client, prompts):
+    data = client.get("/api/v1/prompts?fields=content,excerpt&excerpt=5").get_json()
+    for prompt in data["prompts"]:
+        assert prompt["excerpt"] == prompt["content"][:5]
+
+
+def test_membership_excerpt_is_truncated_in_query(
+    app, client, author, prompts, pipelines
+):
+    from app.models import Prompt
+
+    login(client, app, author)
+    Prompt.objects(id=prompts[2].id).delete()
+    response = client.get("/api/v1/user/likes?excerpt=6&per_page=2")
+    assert response.status_code == 200
+    body = response.get_json()
+    # 指向已删除提示词的记录被跳过，但仍占据游标位置
+    assert [p["excerpt"] for p in body["prompts"]] == ["1 long"]
+    assert body["pagination"]["has_next"]
+    project = pipelines[-1][-1]["$project"]
+    assert "prompt.content" not in project and "excerpt" in project
+
+    cursor = body["pagination"]["next_cursor"]
+    body = client.get(f"/api/v1/user/likes?excerpt=6&cursor={cursor}").get_json()
+    assert [p["excerpt"] for p in body["prompts"]] == ["0 long"]
@@ -0,0 +1,106 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+pytest.importorskip("mongomock")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = 2
+THREADS = 8
+# 超过所有 worker 的哈希线程与排队上限之和
+LOGINS = 16
+
+
+def fetch(url, data=None, timeout=60):
+    """返回状态码，非 2xx 不抛出异常"""
+    request = Request(url)
+    if data is not None:
+        request = Request(
+            url,
+            json.dumps(data).encode(),
+            {"Content-Type": "application/json"},
+        )
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            return response.status
+    except HTTPError as e:
+        return e.code
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def server():
+    if shutil.which("gunicorn") is None:
+        pytest.skip("gunicorn is not installed")
+    port = free_port()
+    # 与 Dockerfile 相同的 worker 模型：多进程，每个进程多线程
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn",
+            "-w", str(WORKERS),
+            "-k", "gthread",
+            "--threads", str(THREADS),
+            "-b", f"127.0.0.1:{port}",
+            "--chdir", ROOT,
+            "tests.mongomock_wsgi:app",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        ready = 0
+        while ready < WORKERS:
+            if process.poll() is not None or time.monotonic() > deadline:
+                pytest.fail("gunicorn did not start")
+            try:
+                fetch(f"{url}/api/v1/languages", timeout=1)
+                ready += 1
+            except OSError:
+                time.sleep(0.2)
+        # 等所有 worker 都完成启动时的哈希
+        time.sleep(3)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+def login(url):
+    return fetch(
+        f"{url}/api/v1/auth/login",
+        {"email": "login@example.com", "password": "secret"},
+    )
+
+
+def test_concurrent_logins_are_shed_while_reads_continue(server):
+    with ThreadPoolExecutor(LOGINS) as pool:
+        futures = [pool.submit(login, server) for _ in range(LOGINS)]
+        time.sleep(0.2)
+        started = time.monotonic()
+        read = fetch(f"{server}/api/v1/languages", timeout=30)
+        read_time = time.monotonic() - started
+        statuses = [future.result() for future in futures]
+
+    # 每个 worker 同时最多 1 个哈希 + 1 个排队，其余登录立即返回 503
+    assert statuses.count(503) >= LOGINS - WORKERS * 2
+    assert statuses.count(200) >= 1
+    assert set(statuses) <= {200, 503}
+    # 哈希占用的线程有上限，读请求仍有空闲线程处理
+    assert read == 200
+    assert read_time < 2
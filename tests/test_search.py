@@ -0,0 +1,179 @@
+import pytest
+
+from app.search import SearchIndex, SuggestIndex, tokenize
+
+
+def make_index(*docs):
+    index = SearchIndex()
+    for i, (title, content) in enumerate(docs):
+        index._add({"_id": f"p{i}", "title": title, "content": content})
+    return index
+
+
+def test_tokenize_keeps_accented_latin_words():
+    assert tokenize("Café au lait, naïve") == ["café", "au", "lait", "naïve"]
+
+
+def test_tokenize_normalizes_width_and_composition():
+    # 全角字母、分解形式的重音都规范化为同一个词
+    assert tokenize("ＰＹＴＨＯＮ") == ["python"]
+    assert tokenize("cafe\u0301") == tokenize("café")
+
+
+def test_tokenize_splits_on_underscore_and_punctuation():
+    assert tokenize("snake_case-name x2") == ["snake", "case", "name", "x2"]
+
+
+def test_tokenize_cjk_bigrams():
+    assert tokenize("中文分词") == ["中文", "文分", "分词"]
+    assert tokenize("日") == ["日"]
+    assert tokenize("用Python写爬虫") == ["用", "python", "写爬", "爬虫"]
+    assert tokenize("한국어") == ["한국", "국어"]
+
+
+def test_tokenize_other_scripts():
+    assert tokenize("Привет мир") == ["привет", "мир"]
+    assert tokenize("") == [] and tokenize(None) == []
+
+
+def test_bm25_ranks_title_and_frequency():
+    index = make_index(
+        ("notes", "python"),
+        ("python tips", "general"),
+        ("notes", "python python"),
+    )
+    ranked = [pid for _, pid in index.search("python", 10)]
+    assert ranked[0] == "p1"
+    assert ranked.index("p2") < ranked.index("p0")
+
+
+def test_bm25_cjk_query_matches_bigrams():
+    index = make_index(("中文分词", "介绍"), ("英文", "单词"))
+    assert [pid for _, pid in index.search("分词", 10)] == ["p0"]
+
+
+def test_bm25_removed_documents_are_not_returned():
+    index = make_index(("python", "a"), ("python", "b"))
+    index.ready = True
+    index.remove("p0")
+    assert [pid for _, pid in index.search("python", 10)] == ["p1"]
+
+
+def test_document_frequency_tracks_live_slots():
+    index = make_index(("python", "a"), ("python rust", "b"), ("rust", "c"))
+    index.ready = True
+    index.remove("p1")
+    df = {term: index._df[index._term_ids[term]] for term in ("python", "rust")}
+    assert df == {"python": 1, "rust": 1}
+    index._compact()
+    assert {t: index._df[index._term_ids[t]] for t in df} == df
+    assert [pid for _, pid in index.search("rust", 10)] == ["p2"]
+
+
+def test_bm25_cursor_continues_after_last_hit():
+    index = make_index(*[("python", "x " * i) for i in range(5)])
+    first = index.search("python", 2)
+    rest = index.search("python", 10, after=first[-1])
+    assert [hit[1] for hit in first + rest] == [
+        hit[1] for hit in index.search("python", 10)
+    ]
+
+
+def test_suggest_matches_normalized_prefix():
+    index = SuggestIndex()
+    index._items = sorted(
+        [
+            SuggestIndex._entry("prompt", "1", "Café guide", None, 3),
+            SuggestIndex._entry("prompt", "2", "ＰＹＴＨＯＮ tips", None, 1),
+        ]
+    )
+    assert [item["id"] for item in index.suggest("CAFE\u0301")] == ["1"]
+    assert [item["id"] for item in index.suggest("py")] == ["2"]
+
+
+@pytest.fixture
+def prompts(app, author):
+    from app.models import Prompt, PromptStatus
+
+    return [
+        Prompt(
+            title=f"python tips {i}",
+            content="body " * (i + 1),
+            author=author,
+            status=PromptStatus.PUBLISHED,
+        ).save()
+        for i in range(12)
+    ]
+
+
+@pytest.fixture
+def index(app, prompts, monkeypatch):
+    from app.search import search_index
+
+    # 不压缩，保留失效槽位
+    monkeypatch.setattr(search_index, "compact_ratio", 1)
+    search_index.build()
+    return search_index
+
+
+def test_sync_applies_deletes_from_other_workers(index, prompts):
+    from app.models import Prompt, DeleteJob
+
+    # 其他 worker 删除：数据库中已删除，本进程索引未收到通知
+    gone = [p.id for p in prompts[:3]]
+    Prompt.objects(id__in=gone).delete()
+    DeleteJob(prompt_ids=gone).save()
+
+    index.sync()
+    ids = {prompt_id for _, prompt_id in index.search("python", 20)}
+    assert ids == {p.id for p in prompts[3:]}
+
+
+def test_reconcile_removes_unpublished_without_updated_at(index, prompts):
+    from app.models import Prompt, PromptStatus
+
+    Prompt.objects(id=prompts[0].id).update(set__status=PromptStatus.REJECTED.value)
+    assert index.reconcile() == 1
+    assert prompts[0].id not in {pid for _, pid in index.search("python", 20)}
+
+
+def test_idf_ignores_dead_slots(index, prompts):
+    fresh = SearchIndex()
+    for p in prompts[1:]:
+        fresh._add(
+            {"_id": p.id, "title": p.title, "content": p.content, "type": "prompt"}
+        )
+    index.remove(prompts[0].id)
+    assert index.search("python", 20) == fresh.search("python", 20)
+
+
+def test_index_search_hits_refills_past_ghosts(index, prompts):
+    from app.api import index_search_hits
+    from app.models import Prompt
+
+    ranked = [pid for _, pid in index.search("python", 20)]
+    Prompt.objects(id__in=ranked[:4]).delete()
+
+    hits = index_search_hits("python", 5, {})
+    assert [hit["_id"] for hit in hits] == ranked[4:9]
+    assert len(index.search("python", 20)) == 8
+
+
+def test_sync_picks_up_prompts_created_after_empty_build(app, author):
+    from app.models import Prompt, PromptStatus
+
+    index = SearchIndex()
+    index.build()
+    prompt = Prompt(
+        title="rust", content="ownership", author=author, status=PromptStatus.PUBLISHED
+    ).save()
+    index.sync()
+    assert [pid for _, pid in index.search("rust", 5)] == [prompt.id]
+
+
+def test_search_requests_do_not_sync_inline(index, monkeypatch):
+    calls = []
+    monkeypatch.setattr(index, "sync", lambda: calls.append(1))
+    monkeypatch.setattr(index, "_ensure_worker", lambda: None)
+    assert index.ensure_ready()
+    assert calls == []
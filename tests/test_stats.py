@@ -0,0 +1,47 @@
+import pytest
+
+
+@pytest.fixture
+def prompts(app, author):
+    from app.models import Language, Prompt, PromptStatus
+
+    python = Language(name="Python", name_zh="Python", slug="python").save()
+    return [
+        Prompt(
+            title="with language",
+            content="x",
+            author=author,
+            language=python,
+            status=PromptStatus.PUBLISHED,
+        ).save(),
+        # 未设置语言的提示词在分组统计中的键为 None
+        Prompt(
+            title="without language",
+            content="x",
+            author=author,
+            status=PromptStatus.PUBLISHED,
+        ).save(),
+    ]
+
+
+def test_stats_with_language_less_prompt(client, prompts):
+    response = client.get("/api/v1/prompts/stats")
+    assert response.status_code == 200
+    assert response.get_json()["total_count"] == 2
+    assert response.headers.get("ETag")
+
+
+def test_languages_with_language_less_prompt(client, prompts):
+    response = client.get("/api/v1/languages")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    again = client.get("/api/v1/languages", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+
+def test_version_is_stable_across_recomputes(app, prompts):
+    from app.stats import prompt_stats
+
+    first = prompt_stats.get()["version"]
+    prompt_stats.invalidate()
+    assert prompt_stats.get()["version"] == first